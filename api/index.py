@@ -4,4 +4,7 @@ import os
 # IMPORTANT pour que "app/" soit importable sur Vercel
 sys.path.append(os.getcwd())
 
+# Vercel: pas de pool local, les connexions passent par le pooler Supabase
+os.environ.setdefault("DEPLOYMENT_MODE", "serverless")
+
 from app.main import app
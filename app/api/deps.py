@@ -4,22 +4,49 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import decode_access_token
 from app.models.user import Utilisateur
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+# Champs de l'utilisateur conservés en cache (jamais le password_hash)
+PRINCIPAL_FIELDS = (
+    "id_utilisateur", "email", "nom", "prenom", "role",
+    "base_affectee", "telephone", "actif", "date_inscription"
+)
 
-async def get_current_user(
-    db: AsyncSession = Depends(get_db),
-    token: str = Depends(oauth2_scheme)
-) -> Utilisateur:
-    credentials_exception = HTTPException(
+_user_cache = TTLCache(ttl=settings.USER_CACHE_TTL_SECONDS, maxsize=settings.USER_CACHE_MAXSIZE)
+
+
+def invalidate_user(user_id: int) -> None:
+    """
+    Retire un utilisateur du cache (changement de mot de passe, désactivation,
+    changement de rôle ou de BO).
+    """
+    _user_cache.delete(int(user_id))
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token invalide ou expiré",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+) -> Utilisateur:
+    """
+    Utilisateur du token. Servi depuis le cache quand c'est possible:
+    l'objet retourné est alors détaché de la session (lecture seule),
+    recharger l'utilisateur avant de le modifier.
+    """
+    credentials_exception = _credentials_exception()
     
     payload = decode_access_token(token)
     if payload is None:
@@ -29,10 +56,16 @@ async def get_current_user(
     if user_id is None:
         raise credentials_exception
     
-    result = await db.execute(
-        select(Utilisateur).where(Utilisateur.id_utilisateur == int(user_id))
-    )
-    user = result.scalar_one_or_none()
+    fields = _user_cache.get(int(user_id))
+    if fields is not None:
+        user = Utilisateur(**fields)
+    else:
+        result = await db.execute(
+            select(Utilisateur).where(Utilisateur.id_utilisateur == int(user_id))
+        )
+        user = result.scalar_one_or_none()
+        if user is not None and settings.USER_CACHE_TTL_SECONDS > 0:
+            _user_cache.set(user.id_utilisateur, {name: getattr(user, name) for name in PRINCIPAL_FIELDS})
     
     if user is None:
         raise credentials_exception
@@ -46,6 +79,30 @@ async def get_current_user(
     return user
 
 
+async def get_current_user_readonly(
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(oauth2_scheme)
+) -> Utilisateur:
+    """
+    Variante pour les endpoints en lecture seule.
+    Si AUTH_TRUST_TOKEN_CLAIMS est activé, l'identité, le rôle et la BO
+    sont pris dans le token sans accès au cache ni à la base.
+    """
+    if settings.AUTH_TRUST_TOKEN_CLAIMS:
+        payload = decode_access_token(token)
+        if payload is None or payload.get("sub") is None:
+            raise _credentials_exception()
+        if "role" in payload and "bo" in payload:
+            return Utilisateur(
+                id_utilisateur=int(payload["sub"]),
+                email=payload.get("email"),
+                role=payload["role"],
+                base_affectee=payload["bo"],
+                actif=True
+            )
+    return await get_current_user(db, token)
+
+
 async def get_current_active_admin(
     current_user: Utilisateur = Depends(get_current_user)
 ) -> Utilisateur:
@@ -0,0 +1,75 @@
+import hashlib
+from datetime import datetime
+from typing import Sequence
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_user_readonly, get_user_bo_filter
+from app.core.database import get_db
+from app.models.user import Utilisateur
+from app.services.versions import get_versions
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    # Comparaison faible: W/"x" et "x" sont équivalents
+    return any(value.removeprefix("W/") == etag for value in candidates)
+
+
+async def check_etag(
+    request: Request,
+    response: Response,
+    db: AsyncSession,
+    current_user: Utilisateur,
+    tables: Sequence[str],
+    max_age: int = 0
+) -> str:
+    """
+    GET conditionnel: ETag calculé à partir de la version des `tables` lues
+    par l'endpoint, du chemin, des paramètres, de la BO de l'utilisateur et
+    de la date du jour. Lève une 304 si If-None-Match correspond.
+    À appeler après les contrôles d'existence et d'accès propres à la ressource.
+    - max_age=0: le client revalide à chaque requête (Cache-Control: no-cache)
+    - max_age>0: réponse réutilisable sans revalidation pendant max_age secondes
+    """
+    if max_age > 0:
+        cache_control = f"private, max-age={max_age}, must-revalidate"
+    else:
+        cache_control = "private, no-cache"
+
+    versions = await get_versions(db, tables)
+    key = "|".join([
+        request.url.path,
+        "&".join(sorted(f"{name}={value}" for name, value in request.query_params.multi_items())),
+        get_user_bo_filter(current_user) or "",
+        datetime.utcnow().date().isoformat(),
+        ",".join(f"{table}:{version}" for table, version in sorted(versions.items())),
+    ])
+    etag = f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return etag
+
+
+def conditional_get(tables: Sequence[str], max_age: int = 0):
+    """
+    Dépendance de GET conditionnel (check_etag) pour les endpoints sans
+    contrôle d'accès propre à la ressource: répond 304 sans exécuter l'endpoint.
+    """
+    async def dependency(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_db),
+        current_user: Utilisateur = Depends(get_current_user_readonly)
+    ) -> str:
+        return await check_etag(request, response, db, current_user, tables, max_age)
+
+    return dependency
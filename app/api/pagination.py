@@ -0,0 +1,194 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, tuple_, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+PAGINATION_OFFSET = "offset"
+PAGINATION_CURSOR = "cursor"
+
+COUNT_EXACT = "exact"
+COUNT_ESTIMATED = "estimated"
+COUNT_NONE = "none"
+
+# Totaux exacts récents, clé = (liste, filtres normalisés)
+_count_cache = TTLCache(ttl=settings.COUNT_CACHE_TTL_SECONDS, maxsize=2048)
+
+
+def encode_cursor(date_value: Optional[datetime], key: Any) -> str:
+    """
+    Encode la position (date, clé) de la dernière ligne d'une page en jeton opaque.
+    """
+    payload = [date_value.isoformat() if date_value else None, key]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, key_type: type) -> Tuple[Optional[datetime], Any]:
+    """
+    Décode un jeton produit par encode_cursor.
+    Lève une 400 si le jeton est invalide.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        date_value, key = json.loads(raw)
+        return (
+            datetime.fromisoformat(date_value) if date_value else None,
+            key_type(key)
+        )
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Curseur de pagination invalide"
+        )
+
+
+def keyset_order(date_column, key_column) -> tuple:
+    """
+    Ordre stable (date DESC NULLS FIRST, clé DESC), parcours arrière
+    d'un index composite (date, clé).
+    """
+    return (date_column.desc().nullsfirst(), key_column.desc())
+
+
+def keyset_condition(date_column, key_column, cursor: Tuple[Optional[datetime], Any]):
+    """
+    Condition "après le curseur" correspondant à keyset_order.
+    Les lignes à date NULL viennent en premier.
+    """
+    date_value, key = cursor
+    if date_value is None:
+        return or_(
+            and_(date_column.is_(None), key_column < key),
+            date_column.isnot(None)
+        )
+    return tuple_(date_column, key_column) < tuple_(date_value, key)
+
+
+def page_query(
+    query,
+    date_column,
+    key_column,
+    page: int,
+    limit: int,
+    pagination: str,
+    after: Optional[str]
+):
+    """
+    Applique l'ordre (date, clé) et la pagination offset ou curseur.
+    Lit limit + 1 lignes pour savoir s'il existe une page suivante.
+    """
+    query = query.order_by(*keyset_order(date_column, key_column))
+    if pagination == PAGINATION_CURSOR or after is not None:
+        if after:
+            key_type = key_column.type.python_type
+            query = query.where(keyset_condition(date_column, key_column, decode_cursor(after, key_type)))
+    else:
+        query = query.offset((page - 1) * limit)
+    return query.limit(limit + 1)
+
+
+async def fetch_page(
+    db: AsyncSession,
+    query,
+    date_column,
+    key_column,
+    page: int,
+    limit: int,
+    pagination: str,
+    after: Optional[str]
+) -> Tuple[list, bool, Optional[str]]:
+    """
+    Exécute la page construite par page_query.
+    Retourne (lignes, has_more, next_cursor).
+    """
+    use_cursor = pagination == PAGINATION_CURSOR or after is not None
+    query = page_query(query, date_column, key_column, page, limit, pagination, after)
+    result = await db.execute(query)
+    rows = result.scalars().all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if use_cursor and has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, date_column.key), getattr(last, key_column.key))
+
+    return rows, has_more, next_cursor
+
+
+# Filtres texte insensibles à la casse (ILIKE); les autres sont des égalités exactes
+CASE_INSENSITIVE_FILTERS = ("search",)
+
+
+def count_cache_key(listing: str, filters: Dict[str, Any]) -> tuple:
+    """
+    Clé de cache normalisée: filtres vides ignorés, ordre indifférent,
+    recherche texte insensible à la casse (égalités SQL conservées telles quelles).
+    """
+    normalized = []
+    for name, value in filters.items():
+        if value is None or value == "":
+            continue
+        if name in CASE_INSENSITIVE_FILTERS and isinstance(value, str):
+            value = value.strip().lower()
+        normalized.append((name, value))
+    return (listing, tuple(sorted(normalized)))
+
+
+async def _planner_estimate(db: AsyncSession, query) -> int:
+    """
+    Estimation du nombre de lignes par le planificateur Postgres
+    (EXPLAIN, sans exécuter la requête).
+    """
+    conn = await db.connection()
+    compiled = query.compile(dialect=conn.dialect)
+    positions = compiled.positiontup or []
+    params = tuple(compiled.params[name] for name in positions)
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", params)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_total(
+    db: AsyncSession,
+    entity,
+    conditions: List,
+    count_mode: str,
+    cache_key: tuple
+) -> Optional[int]:
+    """
+    Total d'une liste paginée selon count_mode:
+    - exact: SELECT count(*) (résultat mis en cache)
+    - estimated: total en cache si récent, sinon estimation du planificateur
+      (Postgres) ou count exact (autres bases)
+    - none: pas de total
+    """
+    if count_mode == COUNT_NONE:
+        return None
+
+    if count_mode == COUNT_ESTIMATED:
+        cached = _count_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        if db.bind.dialect.name == "postgresql":
+            return await _planner_estimate(db, select(entity).where(*conditions))
+
+    result = await db.execute(select(func.count()).select_from(entity).where(*conditions))
+    total = result.scalar()
+    _count_cache.set(cache_key, total)
+    return total
+
+
+def total_pages_for(total: Optional[int], limit: int) -> Optional[int]:
+    if total is None:
+        return None
+    return (total + limit - 1) // limit if total > 0 else 1
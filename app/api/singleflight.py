@@ -0,0 +1,56 @@
+import functools
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import BackgroundTasks, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_user_bo_filter
+from app.core.singleflight import get_flight
+from app.models.user import Utilisateur
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return tuple(_normalize(item) for item in value)
+    return value
+
+
+def _params_key(params) -> tuple:
+    """Paramètres normalisés: valeurs vides ignorées, ordre indifférent."""
+    return tuple(sorted(
+        (name, _normalize(value))
+        for name, value in params
+        if value is not None and value != ""
+    ))
+
+
+def single_flight(name: Optional[str] = None):
+    """
+    Décorateur d'endpoint: les requêtes concurrentes identiques (même endpoint,
+    mêmes paramètres normalisés, même BO selon get_user_bo_filter) partagent
+    une seule exécution.
+    À placer sous @router.get. Réservé aux endpoints en lecture dont tout le
+    résultat est la valeur retournée (pas d'en-têtes posés sur Response).
+    """
+    def decorator(handler: Callable[..., Awaitable[Any]]):
+        flight = get_flight(name or handler.__name__)
+
+        @functools.wraps(handler)
+        async def wrapper(**kwargs):
+            scope = None
+            params = []
+            for param, value in kwargs.items():
+                if isinstance(value, Utilisateur):
+                    scope = get_user_bo_filter(value)
+                elif not isinstance(value, (AsyncSession, Request, Response, BackgroundTasks)):
+                    params.append((param, value))
+
+            key = (scope, _params_key(params))
+            return await flight.do(key, lambda: handler(**kwargs))
+
+        return wrapper
+
+    return decorator
+
@@ -1,15 +1,23 @@
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.core.database import get_db
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_current_user_readonly
+from app.api.pagination import fetch_page, count_total, count_cache_key, total_pages_for
 from app.models.user import Utilisateur
 from app.models.concentrateur import Concentrateur
+from app.models.poste import PosteElectrique
 from app.models.action import HistoriqueAction
+from app.models.idempotency import ActionIdempotency
+from app.services.activity import activity_key, record_activity
+from app.services.counters import apply_counter_changes, concentrateur_key, counter_key
+from app.services.scan import invalidate_scans
+from app.services.versions import bump_versions, CONCENTRATEUR, HISTORIQUE_ACTION
 
 router = APIRouter()
 
@@ -25,6 +33,14 @@ class ActionCreate(BaseModel):
     scan_qr: bool = False
 
 
+class ActionBatchItem(ActionCreate):
+    idempotency_key: str = Field(..., min_length=1, max_length=100)
+
+
+class ActionBatchRequest(BaseModel):
+    actions: List[ActionBatchItem] = Field(..., min_length=1, max_length=500)
+
+
 class ActionResponse(BaseModel):
     id_action: int
     type_action: str
@@ -43,6 +59,29 @@ class ActionResponse(BaseModel):
         from_attributes = True
 
 
+def resoudre_transition(
+    type_action: str,
+    nouvel_etat: Optional[str],
+    nouvelle_affectation: Optional[str],
+    base_affectee: Optional[str]
+):
+    """
+    Nouvel état et nouvelle affectation selon le type d'action.
+    Retourne (nouvel_etat, nouvelle_affectation), None = inchangé.
+    """
+    if type_action == 'pose':
+        return 'pose', base_affectee
+    if type_action == 'depose':
+        return 'en_stock', 'Labo'
+    if type_action == 'reception_magasin':
+        return 'en_stock', 'Magasin'
+    if type_action == 'transfert_bo':
+        return 'en_stock', nouvelle_affectation
+    if type_action == 'mise_au_rebut':
+        return 'hs', nouvelle_affectation
+    return nouvel_etat, nouvelle_affectation
+
+
 @router.post("", response_model=ActionResponse, status_code=status.HTTP_201_CREATED)
 async def create_action(
     data: ActionCreate,
@@ -52,9 +91,11 @@ async def create_action(
     """
     Créer une nouvelle action sur un concentrateur.
     """
-    # Vérifier que le concentrateur existe
+    # Vérifier que le concentrateur existe (verrouillé: ancienne clé de compteur stable)
     result = await db.execute(
-        select(Concentrateur).where(Concentrateur.numero_serie == data.concentrateur_id)
+        select(Concentrateur)
+        .where(Concentrateur.numero_serie == data.concentrateur_id)
+        .with_for_update()
     )
     concentrateur = result.scalar_one_or_none()
     
@@ -67,26 +108,15 @@ async def create_action(
     # Sauvegarder les anciennes valeurs
     ancien_etat = concentrateur.etat
     ancienne_affectation = concentrateur.affectation
+    ancienne_cle = concentrateur_key(concentrateur)
     
     # Déterminer le nouvel état et affectation selon le type d'action
-    nouvel_etat = data.nouvel_etat
-    nouvelle_affectation = data.nouvelle_affectation
-    
-    if data.type_action == 'pose':
-        nouvel_etat = 'pose'
-        nouvelle_affectation = current_user.base_affectee
-    elif data.type_action == 'depose':
-        nouvel_etat = 'en_stock'
-        nouvelle_affectation = 'Labo'
-    elif data.type_action == 'reception_magasin':
-        nouvel_etat = 'en_stock'
-        nouvelle_affectation = 'Magasin'
-    elif data.type_action == 'transfert_bo':
-        nouvel_etat = 'en_stock'
-    elif data.type_action == 'mise_au_rebut':
-        nouvel_etat = 'hs'
+    nouvel_etat, nouvelle_affectation = resoudre_transition(
+        data.type_action, data.nouvel_etat, data.nouvelle_affectation, current_user.base_affectee
+    )
     
     # Mettre à jour le concentrateur
+    now = datetime.utcnow()
     if nouvel_etat:
         concentrateur.etat = nouvel_etat
     if nouvelle_affectation:
@@ -94,14 +124,15 @@ async def create_action(
     if data.poste_id:
         concentrateur.poste_id = data.poste_id
     if data.type_action == 'pose':
-        concentrateur.date_pose = datetime.utcnow()
+        concentrateur.date_pose = now
     
-    concentrateur.date_dernier_etat = datetime.utcnow()
+    concentrateur.date_dernier_etat = now
     concentrateur.commentaire = data.commentaire
     
     # Créer l'action
     action = HistoriqueAction(
         type_action=data.type_action,
+        date_action=now,
         ancien_etat=ancien_etat,
         nouvel_etat=nouvel_etat or ancien_etat,
         ancienne_affectation=ancienne_affectation,
@@ -115,45 +146,243 @@ async def create_action(
     )
     
     db.add(action)
+    await apply_counter_changes(db, [(ancienne_cle, concentrateur_key(concentrateur))])
+    await record_activity(db, [
+        activity_key(now, data.type_action, current_user.base_affectee, current_user.id_utilisateur)
+    ])
+    await bump_versions(db, CONCENTRATEUR, HISTORIQUE_ACTION)
     await db.commit()
+    invalidate_scans([data.concentrateur_id])
     await db.refresh(action)
     
     return action
 
 
+@router.post("/batch")
+async def create_actions_batch(
+    data: ActionBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: Utilisateur = Depends(get_current_user)
+):
+    """
+    Synchronisation des actions saisies hors ligne.
+    - Actions appliquées dans l'ordre, en une seule transaction
+    - idempotency_key: une action déjà reçue est signalée "duplicate" sans être rejouée
+    - Lectures et écritures groupées: nombre de requêtes constant quel que soit le lot
+    """
+    keys = [item.idempotency_key for item in data.actions]
+    
+    # État courant des concentrateurs concernés, verrouillés pour la transaction
+    # (dans l'ordre des numéros de série: pas d'interblocage entre deux lots)
+    serials = list(dict.fromkeys(item.concentrateur_id for item in data.actions))
+    result = await db.execute(
+        select(
+            Concentrateur.numero_serie,
+            Concentrateur.etat,
+            Concentrateur.affectation,
+            Concentrateur.operateur,
+            Concentrateur.hs,
+            Concentrateur.poste_id,
+            Concentrateur.date_pose,
+            Concentrateur.commentaire
+        )
+        .where(Concentrateur.numero_serie.in_(serials))
+        .order_by(Concentrateur.numero_serie)
+        .with_for_update()
+    )
+    initial = {row.numero_serie: row for row in result}
+    etats = {numero_serie: dict(row._mapping) for numero_serie, row in initial.items()}
+    
+    # Actions déjà enregistrées lors d'une synchronisation précédente
+    result = await db.execute(
+        select(ActionIdempotency.idempotency_key, ActionIdempotency.id_action)
+        .where(ActionIdempotency.idempotency_key.in_(keys))
+    )
+    deja_recues = {row.idempotency_key: row.id_action for row in result}
+    
+    # Postes référencés par le lot: un poste inconnu est une erreur de l'action, pas du lot
+    poste_ids = {item.poste_id for item in data.actions if item.poste_id}
+    postes = set()
+    if poste_ids:
+        result = await db.execute(
+            select(PosteElectrique.id_poste).where(PosteElectrique.id_poste.in_(poste_ids))
+        )
+        postes = set(result.scalars())
+    
+    # Application en mémoire, dans l'ordre du lot
+    now = datetime.utcnow()
+    resultats = []
+    nouvelles_actions = []
+    vues = set()
+    for index, item in enumerate(data.actions):
+        resultat = {
+            "index": index,
+            "idempotency_key": item.idempotency_key,
+            "concentrateur_id": item.concentrateur_id,
+        }
+        resultats.append(resultat)
+        
+        if item.idempotency_key in deja_recues or item.idempotency_key in vues:
+            resultat.update(status="duplicate", id_action=deja_recues.get(item.idempotency_key))
+            continue
+        vues.add(item.idempotency_key)
+        
+        etat = etats.get(item.concentrateur_id)
+        if etat is None:
+            resultat.update(status="error", detail=f"Concentrateur {item.concentrateur_id} non trouvé")
+            continue
+        if item.poste_id and item.poste_id not in postes:
+            resultat.update(status="error", detail=f"Poste {item.poste_id} non trouvé")
+            continue
+        
+        ancien_etat = etat["etat"]
+        ancienne_affectation = etat["affectation"]
+        nouvel_etat, nouvelle_affectation = resoudre_transition(
+            item.type_action, item.nouvel_etat, item.nouvelle_affectation, current_user.base_affectee
+        )
+        if nouvel_etat:
+            etat["etat"] = nouvel_etat
+        if nouvelle_affectation:
+            etat["affectation"] = nouvelle_affectation
+        if item.poste_id:
+            etat["poste_id"] = item.poste_id
+        if item.type_action == 'pose':
+            etat["date_pose"] = now
+        etat["commentaire"] = item.commentaire
+        
+        nouvelles_actions.append({
+            "type_action": item.type_action,
+            "date_action": now,
+            "ancien_etat": ancien_etat,
+            "nouvel_etat": nouvel_etat or ancien_etat,
+            "ancienne_affectation": ancienne_affectation,
+            "nouvelle_affectation": nouvelle_affectation or ancienne_affectation,
+            "commentaire": item.commentaire,
+            "photo": item.photo,
+            "scan_qr": item.scan_qr,
+            "user_id": current_user.id_utilisateur,
+            "concentrateur_id": item.concentrateur_id,
+            "poste_id": item.poste_id,
+            "idempotency_key": item.idempotency_key,
+            "created_at": now,
+        })
+        resultat.update(
+            status="created",
+            nouvel_etat=etat["etat"],
+            nouvelle_affectation=etat["affectation"]
+        )
+    
+    if nouvelles_actions:
+        modifies = {action["concentrateur_id"] for action in nouvelles_actions}
+        
+        # État final de chaque concentrateur: un UPDATE groupé par clé primaire
+        await db.execute(
+            update(Concentrateur),
+            [
+                {
+                    "numero_serie": numero_serie,
+                    "etat": etats[numero_serie]["etat"],
+                    "affectation": etats[numero_serie]["affectation"],
+                    "poste_id": etats[numero_serie]["poste_id"],
+                    "date_pose": etats[numero_serie]["date_pose"],
+                    "commentaire": etats[numero_serie]["commentaire"],
+                    "date_dernier_etat": now,
+                    "updated_at": now,
+                }
+                for numero_serie in modifies
+            ]
+        )
+        
+        # Historique en un seul INSERT, clés d'idempotence dans la même transaction
+        result = await db.execute(
+            insert(HistoriqueAction)
+            .returning(HistoriqueAction.idempotency_key, HistoriqueAction.id_action),
+            nouvelles_actions
+        )
+        ids = {row.idempotency_key: row.id_action for row in result}
+        try:
+            await db.execute(
+                insert(ActionIdempotency),
+                [
+                    {"idempotency_key": key, "id_action": id_action, "date_action": now}
+                    for key, id_action in ids.items()
+                ]
+            )
+        except IntegrityError:
+            # Clé primaire de action_idempotency: même clé insérée par une
+            # synchronisation concurrente
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Synchronisation concurrente détectée, veuillez réessayer"
+            )
+        for resultat in resultats:
+            if resultat["status"] != "error" and resultat.get("id_action") is None:
+                resultat["id_action"] = ids.get(resultat["idempotency_key"])
+        
+        await apply_counter_changes(db, [
+            (
+                counter_key(initial[numero_serie].affectation, initial[numero_serie].operateur,
+                            initial[numero_serie].etat, initial[numero_serie].hs),
+                counter_key(etats[numero_serie]["affectation"], etats[numero_serie]["operateur"],
+                            etats[numero_serie]["etat"], etats[numero_serie]["hs"])
+            )
+            for numero_serie in modifies
+        ])
+        await record_activity(db, [
+            activity_key(now, action["type_action"], current_user.base_affectee, current_user.id_utilisateur)
+            for action in nouvelles_actions
+        ])
+        await bump_versions(db, CONCENTRATEUR, HISTORIQUE_ACTION)
+    
+    await db.commit()
+    invalidate_scans({action.concentrateur_id for action in data.actions})
+    
+    return {
+        "message": "Synchronisation effectuée",
+        "total": len(resultats),
+        "created": sum(1 for r in resultats if r["status"] == "created"),
+        "duplicates": sum(1 for r in resultats if r["status"] == "duplicate"),
+        "errors": sum(1 for r in resultats if r["status"] == "error"),
+        "resultats": resultats
+    }
+
+
 @router.get("/me")
 async def get_my_actions(
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=100),
+    pagination: str = Query("offset", pattern="^(offset|cursor)$"),
+    after: Optional[str] = None,
+    count_mode: str = Query("exact", pattern="^(exact|estimated|none)$"),
     db: AsyncSession = Depends(get_db),
-    current_user: Utilisateur = Depends(get_current_user)
+    current_user: Utilisateur = Depends(get_current_user_readonly)
 ):
     """
     Liste des actions de l'utilisateur connecté.
     """
+    conditions = [HistoriqueAction.user_id == current_user.id_utilisateur]
+    
     # Compter le total
-    count_query = select(func.count()).select_from(HistoriqueAction).where(
-        HistoriqueAction.user_id == current_user.id_utilisateur
+    total = await count_total(
+        db, HistoriqueAction, conditions, count_mode,
+        count_cache_key("actions", {"user_id": current_user.id_utilisateur})
     )
-    result = await db.execute(count_query)
-    total = result.scalar()
     
     # Récupérer les actions
-    offset = (page - 1) * limit
-    query = select(HistoriqueAction).where(
-        HistoriqueAction.user_id == current_user.id_utilisateur
-    ).order_by(HistoriqueAction.date_action.desc()).offset(offset).limit(limit)
-    
-    result = await db.execute(query)
-    actions = result.scalars().all()
-    
-    total_pages = (total + limit - 1) // limit if total > 0 else 1
+    query = select(HistoriqueAction).where(*conditions)
+    actions, has_more, next_cursor = await fetch_page(
+        db, query, HistoriqueAction.date_action, HistoriqueAction.id_action,
+        page, limit, pagination, after
+    )
     
     return {
         "data": actions,
         "total": total,
         "page": page,
-        "total_pages": total_pages
+        "total_pages": total_pages_for(total, limit),
+        "has_more": has_more,
+        "next_cursor": next_cursor
     }
 
 
@@ -164,15 +393,17 @@ async def get_actions(
     concentrateur_id: Optional[str] = None,
     user_id: Optional[int] = None,
     type_action: Optional[str] = None,
+    pagination: str = Query("offset", pattern="^(offset|cursor)$"),
+    after: Optional[str] = None,
+    count_mode: str = Query("exact", pattern="^(exact|estimated|none)$"),
     db: AsyncSession = Depends(get_db),
-    current_user: Utilisateur = Depends(get_current_user)
+    current_user: Utilisateur = Depends(get_current_user_readonly)
 ):
     """
     Liste des actions avec filtres.
+    - pagination=cursor (ou after=<jeton>): pagination par curseur
+    - count_mode: exact, estimated (cache / estimation) ou none (has_more seul)
     """
-    query = select(HistoriqueAction)
-    count_query = select(func.count()).select_from(HistoriqueAction)
-    
     conditions = []
     if concentrateur_id:
         conditions.append(HistoriqueAction.concentrateur_id == concentrateur_id)
@@ -181,24 +412,26 @@ async def get_actions(
     if type_action:
         conditions.append(HistoriqueAction.type_action == type_action)
     
-    for condition in conditions:
-        query = query.where(condition)
-        count_query = count_query.where(condition)
-    
-    result = await db.execute(count_query)
-    total = result.scalar()
-    
-    offset = (page - 1) * limit
-    query = query.order_by(HistoriqueAction.date_action.desc()).offset(offset).limit(limit)
-    
-    result = await db.execute(query)
-    actions = result.scalars().all()
+    total = await count_total(
+        db, HistoriqueAction, conditions, count_mode,
+        count_cache_key("actions", {
+            "concentrateur_id": concentrateur_id,
+            "user_id": user_id,
+            "type_action": type_action
+        })
+    )
     
-    total_pages = (total + limit - 1) // limit if total > 0 else 1
+    query = select(HistoriqueAction).where(*conditions)
+    actions, has_more, next_cursor = await fetch_page(
+        db, query, HistoriqueAction.date_action, HistoriqueAction.id_action,
+        page, limit, pagination, after
+    )
     
     return {
         "data": actions,
         "total": total,
         "page": page,
-        "total_pages": total_pages
+        "total_pages": total_pages_for(total, limit),
+        "has_more": has_more,
+        "next_cursor": next_cursor
     }
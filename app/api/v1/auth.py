@@ -1,19 +1,43 @@
 from datetime import timedelta
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.core.database import get_db
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, invalidate_user, is_admin
 from app.core.config import settings
-from app.core.security import verify_password, create_access_token, get_password_hash
+from app.core.security import verify_and_update_password, create_access_token, get_password_hash_async
 from app.models.user import Utilisateur
 from app.schemas.user import UserResponse
+from app.services.refresh_tokens import (
+    issue_refresh_token,
+    rotate_refresh_token,
+    revoke_user_refresh_tokens,
+)
 
 router = APIRouter()
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+def _create_user_access_token(user: Utilisateur) -> str:
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return create_access_token(
+        data={
+            "sub": str(user.id_utilisateur),
+            "email": user.email,
+            "role": user.role,
+            "bo": user.base_affectee
+        },
+        expires_delta=access_token_expires
+    )
+
+
 @router.post("/login", response_model=dict)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
@@ -21,7 +45,7 @@ async def login(
 ):
     """
     Authentification utilisateur avec email et mot de passe.
-    Retourne un token JWT.
+    Retourne un token JWT et un refresh token (voir /refresh).
     """
     result = await db.execute(
         select(Utilisateur).where(Utilisateur.email == form_data.username)
@@ -38,12 +62,16 @@ async def login(
     # Pour le hackathon: si pas de password_hash, on accepte n'importe quel mot de passe
     # En production, décommenter la vérification ci-dessous
     if user.password_hash:
-        if not verify_password(form_data.password, user.password_hash):
+        valide, nouveau_hash = await verify_and_update_password(form_data.password, user.password_hash)
+        if not valide:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Email ou mot de passe incorrect",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        # Rehash transparent si le coût bcrypt a changé
+        if nouveau_hash:
+            user.password_hash = nouveau_hash
     
     if not user.actif:
         raise HTTPException(
@@ -51,14 +79,13 @@ async def login(
             detail="Compte utilisateur désactivé"
         )
     
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(user.id_utilisateur), "email": user.email, "role": user.role},
-        expires_delta=access_token_expires
-    )
+    access_token = _create_user_access_token(user)
+    refresh_token = await issue_refresh_token(db, user.id_utilisateur)
+    await db.commit()
     
     return {
         "access_token": access_token,
+        "refresh_token": refresh_token,
         "token_type": "bearer",
         "user": {
             "id_utilisateur": user.id_utilisateur,
@@ -72,6 +99,65 @@ async def login(
     }
 
 
+@router.post("/refresh", response_model=dict)
+async def refresh(
+    data: RefreshRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Nouveau token JWT à partir d'un refresh token, sans mot de passe.
+    Le refresh token est consommé et remplacé par un nouveau (rotation).
+    """
+    rotated = await rotate_refresh_token(db, data.refresh_token)
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token invalide ou expiré",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user_id, refresh_token = rotated
+    
+    user = await db.get(Utilisateur, user_id)
+    if not user or not user.actif:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Compte utilisateur désactivé"
+        )
+    
+    access_token = _create_user_access_token(user)
+    await db.commit()
+    
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
+
+@router.post("/revoke")
+async def revoke(
+    user_id: Optional[int] = None,
+    current_user: Utilisateur = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Révoque tous les refresh tokens d'un utilisateur (déconnexion de tous
+    ses appareils à l'expiration de leur token JWT).
+    Sans user_id: l'utilisateur connecté. Un autre utilisateur: admin uniquement.
+    """
+    target_id = user_id if user_id is not None else current_user.id_utilisateur
+    if target_id != current_user.id_utilisateur and not is_admin(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Droits administrateur requis"
+        )
+    
+    revoked = await revoke_user_refresh_tokens(db, target_id)
+    await db.commit()
+    return {"message": "Sessions révoquées", "revoked": revoked}
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
     current_user: Utilisateur = Depends(get_current_user)
@@ -90,7 +176,12 @@ async def set_password(
 ):
     """
     Permet à l'utilisateur de définir/modifier son mot de passe.
+    Les refresh tokens existants sont révoqués.
     """
-    current_user.password_hash = get_password_hash(password)
+    # current_user peut venir du cache (détaché): recharger avant modification
+    user = await db.get(Utilisateur, current_user.id_utilisateur)
+    user.password_hash = await get_password_hash_async(password)
+    await revoke_user_refresh_tokens(db, user.id_utilisateur)
     await db.commit()
+    invalidate_user(user.id_utilisateur)
     return {"message": "Mot de passe mis à jour avec succès"}
@@ -1,63 +1,78 @@
 from typing import Optional, List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, func
+from sqlalchemy.orm import aliased
 from datetime import datetime
 
 from app.core.database import get_db
-from app.api.deps import get_current_user, get_user_bo_filter, is_admin, require_bo_access
+from app.api.deps import get_current_user, get_current_user_readonly, get_user_bo_filter, is_admin, require_bo_access
+from app.api.etag import check_etag, conditional_get
+from app.api.singleflight import single_flight
+from app.api.pagination import (
+    fetch_page, count_total, count_cache_key, total_pages_for,
+    keyset_order, keyset_condition, encode_cursor, decode_cursor
+)
 from app.models.user import Utilisateur
 from app.models.concentrateur import Concentrateur
 from app.models.action import HistoriqueAction
+from app.models.counter import ConcentrateurCounter
+from app.services.activity import activity_key, record_activity
+from app.services.counters import apply_counter_changes, concentrateur_key, NO_AFFECTATION
+from app.services.scan import invalidate_scans, lookup_scans
+from app.services.search import search_condition
+from app.services.export import stream_query, MEDIA_TYPES
+from app.services.stats_cache import cached_stats
+from app.services.versions import bump_versions, CONCENTRATEUR, HISTORIQUE_ACTION
 from app.schemas.concentrateur import (
     ConcentrateurResponse,
     ConcentrateurCreate,
     ConcentrateurUpdate,
     ConcentrateurListResponse,
     ConcentrateurDetailResponse,
-    ConcentrateurVerifyResponse
+    ConcentrateurVerifyResponse,
+    ConcentrateurVerifyBatchRequest,
+    ConcentrateurVerifyBatchResponse
 )
 
 router = APIRouter()
 
 
-@router.get("", response_model=ConcentrateurListResponse)
-async def get_concentrateurs(
-    page: int = Query(1, ge=1),
-    limit: int = Query(50, ge=1, le=100),
-    search: Optional[str] = None,
-    etat: Optional[str] = None,
-    affectation: Optional[str] = None,
-    operateur: Optional[str] = None,
-    db: AsyncSession = Depends(get_db),
-    current_user: Utilisateur = Depends(get_current_user)
-):
-    """
-    Liste des concentrateurs avec pagination et filtres.
-    - Admin: accès à tous les concentrateurs
-    - Autres rôles: accès uniquement aux concentrateurs de leur BO
-    """
-    # Base query
-    query = select(Concentrateur)
-    count_query = select(func.count()).select_from(Concentrateur)
-    
-    # Filtres
+# Colonnes de l'export (GET /concentrateurs/export)
+EXPORT_COLUMNS = (
+    Concentrateur.numero_serie,
+    Concentrateur.modele,
+    Concentrateur.operateur,
+    Concentrateur.etat,
+    Concentrateur.affectation,
+    Concentrateur.hs,
+    Concentrateur.numero_carton,
+    Concentrateur.poste_id,
+    Concentrateur.date_affectation,
+    Concentrateur.date_pose,
+    Concentrateur.date_dernier_etat,
+    Concentrateur.date_creation,
+)
+
+
+async def list_conditions(
+    db: AsyncSession,
+    bo_filter: Optional[str],
+    search: Optional[str],
+    etat: Optional[str],
+    affectation: Optional[str],
+    operateur: Optional[str]
+) -> list:
+    """Filtres de la liste et de l'export des concentrateurs."""
     conditions = []
     
     # Filtre par BO selon le rôle de l'utilisateur
-    bo_filter = get_user_bo_filter(current_user)
     if bo_filter:
         conditions.append(Concentrateur.affectation == bo_filter)
     
-    if search:
-        search_pattern = f"%{search}%"
-        conditions.append(
-            or_(
-                Concentrateur.numero_serie.ilike(search_pattern),
-                Concentrateur.numero_carton.ilike(search_pattern),
-                Concentrateur.operateur.ilike(search_pattern)
-            )
-        )
+    if search and search.strip():
+        conditions.append(await search_condition(db, search))
     
     if etat:
         conditions.append(Concentrateur.etat == etat)
@@ -68,32 +83,92 @@ async def get_concentrateurs(
     if operateur:
         conditions.append(Concentrateur.operateur == operateur)
     
-    # Appliquer les conditions
-    if conditions:
-        for condition in conditions:
-            query = query.where(condition)
-            count_query = count_query.where(condition)
+    return conditions
+
+
+def concentrateur_detail_query(numero_serie: str, limit: int, before: Optional[str] = None):
+    """
+    Concentrateur et ses `limit` + 1 dernières actions (pour has_more), en une
+    requête. Les actions sont lues par l'index (concentrateur_id,
+    date_action DESC, id_action DESC), parcours arrêté après N lignes.
+    Clé constante: la jointure latérale se réduit à une sous-requête LIMIT.
+    Lignes: (Concentrateur, HistoriqueAction ou None).
+    """
+    actions = select(HistoriqueAction).where(HistoriqueAction.concentrateur_id == numero_serie)
+    if before:
+        actions = actions.where(keyset_condition(
+            HistoriqueAction.date_action, HistoriqueAction.id_action,
+            decode_cursor(before, int)
+        ))
+    actions = (
+        actions
+        .order_by(*keyset_order(HistoriqueAction.date_action, HistoriqueAction.id_action))
+        .limit(limit + 1)
+        .subquery()
+    )
+    action = aliased(HistoriqueAction, actions)
+    
+    return (
+        select(Concentrateur, action)
+        .outerjoin(action, action.concentrateur_id == Concentrateur.numero_serie)
+        .where(Concentrateur.numero_serie == numero_serie)
+        .order_by(*keyset_order(action.date_action, action.id_action))
+    )
+
+
+@router.get("", response_model=ConcentrateurListResponse)
+@single_flight("concentrateurs")
+async def get_concentrateurs(
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=100),
+    search: Optional[str] = None,
+    etat: Optional[str] = None,
+    affectation: Optional[str] = None,
+    operateur: Optional[str] = None,
+    pagination: str = Query("offset", pattern="^(offset|cursor)$"),
+    after: Optional[str] = None,
+    count_mode: str = Query("exact", pattern="^(exact|estimated|none)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: Utilisateur = Depends(get_current_user_readonly)
+):
+    """
+    Liste des concentrateurs avec pagination et filtres.
+    - Admin: accès à tous les concentrateurs
+    - Autres rôles: accès uniquement aux concentrateurs de leur BO
+    - pagination=cursor (ou after=<jeton>): pagination par curseur,
+      coût constant quelle que soit la profondeur
+    - count_mode: exact, estimated (cache / estimation) ou none (has_more seul)
+    """
+    bo_filter = get_user_bo_filter(current_user)
+    conditions = await list_conditions(db, bo_filter, search, etat, affectation, operateur)
     
     # Compter le total
-    result = await db.execute(count_query)
-    total = result.scalar()
+    total = await count_total(
+        db, Concentrateur, conditions, count_mode,
+        count_cache_key("concentrateurs", {
+            "bo": bo_filter,
+            "search": search,
+            "etat": etat,
+            "affectation": affectation,
+            "operateur": operateur
+        })
+    )
     
     # Pagination
-    offset = (page - 1) * limit
-    query = query.offset(offset).limit(limit).order_by(Concentrateur.date_dernier_etat.desc())
-    
-    # Exécuter
-    result = await db.execute(query)
-    concentrateurs = result.scalars().all()
-    
-    total_pages = (total + limit - 1) // limit if total > 0 else 1
+    query = select(Concentrateur).where(*conditions)
+    concentrateurs, has_more, next_cursor = await fetch_page(
+        db, query, Concentrateur.date_dernier_etat, Concentrateur.numero_serie,
+        page, limit, pagination, after
+    )
     
     return {
         "data": concentrateurs,
         "total": total,
         "page": page,
         "limit": limit,
-        "total_pages": total_pages
+        "total_pages": total_pages_for(total, limit),
+        "has_more": has_more,
+        "next_cursor": next_cursor
     }
 
 
@@ -101,15 +176,14 @@ async def get_concentrateurs(
 async def verify_concentrateur(
     numero_serie: str,
     db: AsyncSession = Depends(get_db),
-    current_user: Utilisateur = Depends(get_current_user)
+    current_user: Utilisateur = Depends(get_current_user_readonly)
 ):
     """
     Vérifie si un concentrateur existe (pour scan QR rapide).
+    Projection compacte, servie depuis le cache de scan quand c'est possible.
     """
-    result = await db.execute(
-        select(Concentrateur).where(Concentrateur.numero_serie == numero_serie)
-    )
-    concentrateur = result.scalar_one_or_none()
+    scans = await lookup_scans(db, [numero_serie])
+    concentrateur = scans[numero_serie]
     
     return {
         "exists": concentrateur is not None,
@@ -117,44 +191,125 @@ async def verify_concentrateur(
     }
 
 
+@router.post("/verify/batch", response_model=ConcentrateurVerifyBatchResponse)
+async def verify_concentrateurs(
+    data: ConcentrateurVerifyBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: Utilisateur = Depends(get_current_user_readonly)
+):
+    """
+    Vérifie plusieurs numéros de série en un appel (scan d'un carton entier).
+    Les résultats suivent l'ordre de la requête.
+    """
+    scans = await lookup_scans(db, list(dict.fromkeys(data.numeros_serie)))
+    resultats = [
+        {
+            "numero_serie": numero_serie,
+            "exists": scans[numero_serie] is not None,
+            "concentrateur": scans[numero_serie]
+        }
+        for numero_serie in data.numeros_serie
+    ]
+    
+    return {
+        "total": len(resultats),
+        "trouves": sum(1 for r in resultats if r["exists"]),
+        "resultats": resultats
+    }
+
+
+@router.get("/export")
+async def export_concentrateurs(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    search: Optional[str] = None,
+    etat: Optional[str] = None,
+    affectation: Optional[str] = None,
+    operateur: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: Utilisateur = Depends(get_current_user_readonly)
+):
+    """
+    Export complet des concentrateurs en CSV ou NDJSON (mêmes filtres que la liste).
+    - Admin: tout le parc
+    - Autres rôles: concentrateurs de leur BO uniquement
+    Les lignes sont envoyées au fil de la lecture (curseur côté serveur).
+    """
+    conditions = await list_conditions(
+        db, get_user_bo_filter(current_user), search, etat, affectation, operateur
+    )
+    query = (
+        select(*EXPORT_COLUMNS)
+        .where(*conditions)
+        .order_by(Concentrateur.numero_serie)
+    )
+    filename = f"concentrateurs_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{format}"
+    
+    return StreamingResponse(
+        stream_query(query, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 @router.get("/{numero_serie}", response_model=ConcentrateurDetailResponse)
 async def get_concentrateur(
     numero_serie: str,
+    request: Request,
+    response: Response,
+    historique_limit: int = Query(20, ge=1, le=100),
+    historique_before: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: Utilisateur = Depends(get_current_user)
+    current_user: Utilisateur = Depends(get_current_user_readonly)
 ):
     """
-    Détail d'un concentrateur avec son historique d'actions.
+    Détail d'un concentrateur avec ses dernières actions, en une seule requête.
     - Admin: accès à tous les concentrateurs
     - Autres rôles: accès uniquement aux concentrateurs de leur BO
+    - historique_limit: nombre d'actions renvoyées (les plus récentes)
+    - historique_before: curseur historique_next_cursor de la réponse
+      précédente, pour les actions plus anciennes
     """
-    # Récupérer le concentrateur
+    # Existence et accès (projection du cache des scans) avant le GET
+    # conditionnel: pas de 304 pour un concentrateur absent ou hors BO
+    scan = (await lookup_scans(db, [numero_serie]))[numero_serie]
+    if scan is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Concentrateur {numero_serie} non trouvé"
+        )
+    if scan["affectation"]:
+        require_bo_access(current_user, scan["affectation"])
+    await check_etag(request, response, db, current_user, [CONCENTRATEUR, HISTORIQUE_ACTION])
+    
     result = await db.execute(
-        select(Concentrateur).where(Concentrateur.numero_serie == numero_serie)
+        concentrateur_detail_query(numero_serie, historique_limit, historique_before)
     )
-    concentrateur = result.scalar_one_or_none()
+    rows = result.all()
     
-    if not concentrateur:
+    if not rows:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Concentrateur {numero_serie} non trouvé"
         )
+    concentrateur = rows[0][0]
     
     # Vérifier l'accès selon le rôle
     if concentrateur.affectation:
         require_bo_access(current_user, concentrateur.affectation)
     
-    # Récupérer l'historique des actions
-    result = await db.execute(
-        select(HistoriqueAction)
-        .where(HistoriqueAction.concentrateur_id == numero_serie)
-        .order_by(HistoriqueAction.date_action.desc())
-    )
-    historique = result.scalars().all()
+    historique = [row[1] for row in rows if row[1] is not None]
+    has_more = len(historique) > historique_limit
+    historique = historique[:historique_limit]
+    next_cursor = None
+    if has_more:
+        last = historique[-1]
+        next_cursor = encode_cursor(last.date_action, last.id_action)
     
     return {
         "concentrateur": concentrateur,
-        "historique": historique
+        "historique": historique,
+        "historique_has_more": has_more,
+        "historique_next_cursor": next_cursor
     }
 
 
@@ -208,6 +363,7 @@ async def create_concentrateur(
     # Créer l'action de réception
     action = HistoriqueAction(
         type_action='reception_magasin',
+        date_action=datetime.utcnow(),
         nouvel_etat=etat_initial,
         nouvelle_affectation=data.affectation,
         user_id=current_user.id_utilisateur,
@@ -215,7 +371,13 @@ async def create_concentrateur(
     )
     
     db.add(action)
+    await apply_counter_changes(db, [(None, concentrateur_key(concentrateur))])
+    await record_activity(db, [
+        activity_key(action.date_action, action.type_action, current_user.base_affectee, current_user.id_utilisateur)
+    ])
+    await bump_versions(db, CONCENTRATEUR, HISTORIQUE_ACTION)
     await db.commit()
+    invalidate_scans([data.numero_serie])
     await db.refresh(concentrateur)
     
     return concentrateur
@@ -231,9 +393,11 @@ async def update_concentrateur(
     """
     Mettre à jour un concentrateur.
     """
-    # Récupérer le concentrateur
+    # Récupérer le concentrateur (verrouillé: ancienne clé de compteur stable)
     result = await db.execute(
-        select(Concentrateur).where(Concentrateur.numero_serie == numero_serie)
+        select(Concentrateur)
+        .where(Concentrateur.numero_serie == numero_serie)
+        .with_for_update()
     )
     concentrateur = result.scalar_one_or_none()
     
@@ -246,6 +410,7 @@ async def update_concentrateur(
     # Sauvegarder les anciennes valeurs pour l'historique
     ancien_etat = concentrateur.etat
     ancienne_affectation = concentrateur.affectation
+    ancienne_cle = concentrateur_key(concentrateur)
     
     # Mettre à jour les champs
     update_data = data.model_dump(exclude_unset=True)
@@ -259,6 +424,7 @@ async def update_concentrateur(
     if data.etat or data.affectation:
         action = HistoriqueAction(
             type_action='modification',
+            date_action=concentrateur.date_dernier_etat,
             ancien_etat=ancien_etat,
             nouvel_etat=data.etat or ancien_etat,
             ancienne_affectation=ancienne_affectation,
@@ -268,62 +434,67 @@ async def update_concentrateur(
             concentrateur_id=numero_serie
         )
         db.add(action)
+        await record_activity(db, [
+            activity_key(action.date_action, action.type_action, current_user.base_affectee, current_user.id_utilisateur)
+        ])
     
+    await apply_counter_changes(db, [(ancienne_cle, concentrateur_key(concentrateur))])
+    await bump_versions(db, CONCENTRATEUR, HISTORIQUE_ACTION)
     await db.commit()
+    invalidate_scans([numero_serie])
     await db.refresh(concentrateur)
     
     return concentrateur
 
 
-@router.get("/stats/overview")
+@router.get("/stats/overview", dependencies=[Depends(conditional_get([CONCENTRATEUR], max_age=10))])
 async def get_concentrateurs_stats(
     db: AsyncSession = Depends(get_db),
-    current_user: Utilisateur = Depends(get_current_user)
+    current_user: Utilisateur = Depends(get_current_user_readonly)
 ):
     """
     Statistiques des concentrateurs.
     - Admin: stats globales
     - Autres rôles: stats de leur BO uniquement
     """
-    # Filtre par BO selon le rôle
+    # Filtre par BO selon le rôle (lecture des compteurs matérialisés)
     bo_filter = get_user_bo_filter(current_user)
-    
-    # Total
-    count_query = select(func.count()).select_from(Concentrateur)
-    if bo_filter:
-        count_query = count_query.where(Concentrateur.affectation == bo_filter)
-    result = await db.execute(count_query)
-    total = result.scalar()
-    
-    # Par état
-    etat_query = select(Concentrateur.etat, func.count()).group_by(Concentrateur.etat)
-    if bo_filter:
-        etat_query = etat_query.where(Concentrateur.affectation == bo_filter)
-    result = await db.execute(etat_query)
-    par_etat = {row[0]: row[1] for row in result}
-    
-    # Par opérateur
-    operateur_query = select(Concentrateur.operateur, func.count()).group_by(Concentrateur.operateur)
-    if bo_filter:
-        operateur_query = operateur_query.where(Concentrateur.affectation == bo_filter)
-    result = await db.execute(operateur_query)
-    par_operateur = {row[0]: row[1] for row in result}
-    
-    # Par affectation (seulement pour admin)
-    par_affectation = {}
-    if is_admin(current_user):
-        result = await db.execute(
-            select(Concentrateur.affectation, func.count())
-            .where(Concentrateur.affectation.isnot(None))
-            .group_by(Concentrateur.affectation)
-        )
-        par_affectation = {row[0]: row[1] for row in result}
-    else:
-        par_affectation = {bo_filter: total} if bo_filter else {}
-    
-    return {
-        "total": total,
-        "par_etat": par_etat,
-        "par_operateur": par_operateur,
-        "par_affectation": par_affectation
-    }
+    scope = "admin" if is_admin(current_user) else f"bo:{bo_filter or ''}"
+    
+    async def compute():
+        def grouped(column):
+            query = select(column, func.sum(ConcentrateurCounter.total)).group_by(column)
+            if bo_filter:
+                query = query.where(ConcentrateurCounter.affectation == bo_filter)
+            return query.having(func.sum(ConcentrateurCounter.total) > 0)
+        
+        # Par état
+        result = await db.execute(grouped(ConcentrateurCounter.etat))
+        par_etat = {row[0]: row[1] for row in result}
+        
+        # Total
+        total = sum(par_etat.values())
+        
+        # Par opérateur
+        result = await db.execute(grouped(ConcentrateurCounter.operateur))
+        par_operateur = {row[0]: row[1] for row in result}
+        
+        # Par affectation (seulement pour admin)
+        par_affectation = {}
+        if is_admin(current_user):
+            result = await db.execute(
+                grouped(ConcentrateurCounter.affectation)
+                .where(ConcentrateurCounter.affectation != NO_AFFECTATION)
+            )
+            par_affectation = {row[0]: row[1] for row in result}
+        else:
+            par_affectation = {bo_filter: total} if bo_filter else {}
+        
+        return {
+            "total": total,
+            "par_etat": par_etat,
+            "par_operateur": par_operateur,
+            "par_affectation": par_affectation
+        }
+    
+    return await cached_stats(db, "concentrateurs-overview", [CONCENTRATEUR], compute, scope=scope)
@@ -1,15 +1,19 @@
-from typing import Optional
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, insert, case
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.core.database import get_db
 from app.api.deps import get_current_user, is_admin
 from app.models.user import Utilisateur
 from app.models.concentrateur import Concentrateur
 from app.models.action import HistoriqueAction
+from app.services.activity import activity_key, record_activity
+from app.services.counters import apply_counter_changes, counter_key
+from app.services.scan import invalidate_scans
+from app.services.versions import bump_versions, CONCENTRATEUR, HISTORIQUE_ACTION
 
 router = APIRouter()
 
@@ -20,6 +24,186 @@ class TestRequest(BaseModel):
     commentaire: Optional[str] = None
 
 
+class TestBatchRequest(BaseModel):
+    tests: List[TestRequest] = Field(..., min_length=1, max_length=1000)
+
+
+# Résultat de test -> (nouvel état, nouvelle affectation, type d'action)
+TRANSITIONS = {
+    'reparable': ('en_stock', 'Magasin', 'test_labo'),
+    'hs': ('hs', 'Rebut', 'mise_au_rebut'),
+}
+
+
+async def _appliquer_tests(
+    db: AsyncSession,
+    tests: List[TestRequest],
+    current_user: Utilisateur
+) -> List[dict]:
+    """
+    Applique un lot de résultats de test:
+    - une requête de validation (verrouillage) pour tous les numéros de série
+    - un UPDATE ensembliste par résultat ('reparable', 'hs')
+    - un INSERT unique pour l'historique
+    Retourne un résultat par test, dans l'ordre de la demande. Ne commit pas.
+    """
+    serials = list(dict.fromkeys(test.numero_serie for test in tests))
+    result = await db.execute(
+        select(
+            Concentrateur.numero_serie,
+            Concentrateur.etat,
+            Concentrateur.affectation,
+            Concentrateur.operateur,
+            Concentrateur.hs
+        )
+        .where(Concentrateur.numero_serie.in_(serials))
+        .order_by(Concentrateur.numero_serie)
+        .with_for_update()
+    )
+    concentrateurs = {row.numero_serie: row for row in result}
+    
+    # Validation, dans le même ordre que l'endpoint unitaire
+    resultats = []
+    valides = {}
+    for test in tests:
+        row = concentrateurs.get(test.numero_serie)
+        if row is None:
+            resultats.append({
+                "numero_serie": test.numero_serie,
+                "success": False,
+                "status_code": status.HTTP_404_NOT_FOUND,
+                "detail": f"Concentrateur {test.numero_serie} non trouvé"
+            })
+        elif row.affectation != 'Labo' or test.numero_serie in valides:
+            affectation = TRANSITIONS[valides[test.numero_serie].resultat][1] \
+                if test.numero_serie in valides else row.affectation
+            resultats.append({
+                "numero_serie": test.numero_serie,
+                "success": False,
+                "status_code": status.HTTP_400_BAD_REQUEST,
+                "detail": f"Ce concentrateur n'est pas au Labo (affectation: {affectation})"
+            })
+        elif test.resultat not in TRANSITIONS:
+            resultats.append({
+                "numero_serie": test.numero_serie,
+                "success": False,
+                "status_code": status.HTTP_400_BAD_REQUEST,
+                "detail": "Résultat invalide. Utilisez 'reparable' ou 'hs'"
+            })
+        else:
+            valides[test.numero_serie] = test
+            nouvel_etat, nouvelle_affectation, _ = TRANSITIONS[test.resultat]
+            resultats.append({
+                "numero_serie": test.numero_serie,
+                "success": True,
+                "resultat": test.resultat,
+                "nouvel_etat": nouvel_etat,
+                "nouvelle_affectation": nouvelle_affectation
+            })
+    
+    if not valides:
+        return resultats
+    
+    now = datetime.utcnow()
+    
+    # Un UPDATE par résultat, commentaire propre à chaque concentrateur
+    for resultat, (nouvel_etat, nouvelle_affectation, _) in TRANSITIONS.items():
+        groupe = [test for test in valides.values() if test.resultat == resultat]
+        if not groupe:
+            continue
+        commentaires = {test.numero_serie: test.commentaire for test in groupe}
+        if any(commentaires.values()):
+            commentaire = case(commentaires, value=Concentrateur.numero_serie)
+        else:
+            commentaire = None
+        await db.execute(
+            update(Concentrateur)
+            .where(Concentrateur.numero_serie.in_(commentaires))
+            .values(
+                etat=nouvel_etat,
+                affectation=nouvelle_affectation,
+                date_dernier_etat=now,
+                date_affectation=now,
+                hs=(resultat == 'hs'),
+                commentaire=commentaire
+            )
+            .execution_options(synchronize_session=False)
+        )
+    
+    # Historique en un seul INSERT
+    await db.execute(
+        insert(HistoriqueAction),
+        [
+            {
+                "type_action": TRANSITIONS[test.resultat][2],
+                "date_action": now,
+                "ancien_etat": concentrateurs[test.numero_serie].etat,
+                "nouvel_etat": TRANSITIONS[test.resultat][0],
+                "ancienne_affectation": concentrateurs[test.numero_serie].affectation,
+                "nouvelle_affectation": TRANSITIONS[test.resultat][1],
+                "commentaire": f"Test Labo: {test.resultat.upper()}. {test.commentaire or ''}".strip(),
+                "scan_qr": False,
+                "user_id": current_user.id_utilisateur,
+                "concentrateur_id": test.numero_serie,
+                "created_at": now,
+            }
+            for test in valides.values()
+        ]
+    )
+    
+    counter_changes = []
+    for test in valides.values():
+        row = concentrateurs[test.numero_serie]
+        nouvel_etat, nouvelle_affectation, _ = TRANSITIONS[test.resultat]
+        counter_changes.append((
+            counter_key(row.affectation, row.operateur, row.etat, row.hs),
+            counter_key(nouvelle_affectation, row.operateur, nouvel_etat, test.resultat == 'hs')
+        ))
+    await apply_counter_changes(db, counter_changes)
+    await record_activity(db, [
+        activity_key(now, TRANSITIONS[test.resultat][2], current_user.base_affectee, current_user.id_utilisateur)
+        for test in valides.values()
+    ])
+    await bump_versions(db, CONCENTRATEUR, HISTORIQUE_ACTION)
+    
+    return resultats
+
+
+def _require_labo_role(current_user: Utilisateur) -> None:
+    if current_user.role not in ['admin', 'labo']:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Seuls les administrateurs et le personnel labo peuvent enregistrer des tests"
+        )
+
+
+@router.post("/tests/batch")
+async def enregistrer_tests_batch(
+    data: TestBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: Utilisateur = Depends(get_current_user)
+):
+    """
+    Enregistrer les résultats de test d'un rack de concentrateurs.
+    Les tests valides sont appliqués, les autres sont signalés individuellement.
+    - Réservé aux rôles admin et labo
+    """
+    _require_labo_role(current_user)
+    
+    resultats = await _appliquer_tests(db, data.tests, current_user)
+    await db.commit()
+    invalidate_scans(r["numero_serie"] for r in resultats if r["success"])
+    
+    succes = sum(1 for r in resultats if r["success"])
+    return {
+        "message": "Tests enregistrés",
+        "total": len(resultats),
+        "succes": succes,
+        "echecs": len(resultats) - succes,
+        "resultats": resultats
+    }
+
+
 @router.post("/test")
 async def enregistrer_test(
     data: TestRequest,
@@ -32,77 +216,22 @@ async def enregistrer_test(
     - Si HS: marqué comme HS
     - Réservé aux rôles admin et labo
     """
-    # Vérifier le rôle
-    if current_user.role not in ['admin', 'labo']:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Seuls les administrateurs et le personnel labo peuvent enregistrer des tests"
-        )
-    
-    # Récupérer le concentrateur
-    result = await db.execute(
-        select(Concentrateur).where(Concentrateur.numero_serie == data.numero_serie)
-    )
-    concentrateur = result.scalar_one_or_none()
-    
-    if not concentrateur:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Concentrateur {data.numero_serie} non trouvé"
-        )
+    _require_labo_role(current_user)
     
-    if concentrateur.affectation != 'Labo':
+    [resultat] = await _appliquer_tests(db, [data], current_user)
+    if not resultat["success"]:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Ce concentrateur n'est pas au Labo (affectation: {concentrateur.affectation})"
+            status_code=resultat["status_code"],
+            detail=resultat["detail"]
         )
     
-    # Déterminer le nouvel état et affectation selon le résultat
-    ancien_etat = concentrateur.etat
-    ancienne_affectation = concentrateur.affectation
-    
-    if data.resultat == 'reparable':
-        nouvel_etat = 'en_stock'
-        nouvelle_affectation = 'Magasin'
-        type_action = 'test_labo'
-    elif data.resultat == 'hs':
-        nouvel_etat = 'hs'
-        nouvelle_affectation = 'Rebut'
-        type_action = 'mise_au_rebut'
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Résultat invalide. Utilisez 'reparable' ou 'hs'"
-        )
-    
-    # Mettre à jour le concentrateur
-    concentrateur.etat = nouvel_etat
-    concentrateur.affectation = nouvelle_affectation
-    concentrateur.date_dernier_etat = datetime.utcnow()
-    concentrateur.date_affectation = datetime.utcnow()
-    concentrateur.hs = (data.resultat == 'hs')
-    concentrateur.commentaire = data.commentaire
-    
-    # Créer l'action historique
-    action = HistoriqueAction(
-        type_action=type_action,
-        ancien_etat=ancien_etat,
-        nouvel_etat=nouvel_etat,
-        ancienne_affectation=ancienne_affectation,
-        nouvelle_affectation=nouvelle_affectation,
-        commentaire=f"Test Labo: {data.resultat.upper()}. {data.commentaire or ''}".strip(),
-        scan_qr=False,
-        user_id=current_user.id_utilisateur,
-        concentrateur_id=data.numero_serie,
-    )
-    db.add(action)
-    
     await db.commit()
+    invalidate_scans([data.numero_serie])
     
     return {
         "message": "Test enregistré",
         "numero_serie": data.numero_serie,
         "resultat": data.resultat,
-        "nouvel_etat": nouvel_etat,
-        "nouvelle_affectation": nouvelle_affectation
+        "nouvel_etat": resultat["nouvel_etat"],
+        "nouvelle_affectation": resultat["nouvelle_affectation"]
     }
@@ -1,16 +1,21 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, insert
 from datetime import datetime
-from pydantic import BaseModel
-import uuid
+from pydantic import BaseModel, Field
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, in_array
 from app.api.deps import get_current_user, is_admin
 from app.models.user import Utilisateur
 from app.models.concentrateur import Concentrateur
 from app.models.action import HistoriqueAction
+from app.services.activity import activity_key, record_activity
+from app.services.counters import apply_counter_changes, counter_key
+from app.services.reception import receptionner_carton
+from app.services.scan import invalidate_scans
+from app.services.versions import bump_versions, CONCENTRATEUR, HISTORIQUE_ACTION
 
 router = APIRouter()
 
@@ -23,7 +28,7 @@ class ReceptionRequest(BaseModel):
 
 class TransfertRequest(BaseModel):
     bo_destination: str
-    concentrateurs: List[str]
+    concentrateurs: List[str] = Field(..., max_length=5000)
 
 
 @router.post("/reception")
@@ -33,7 +38,7 @@ async def reception_carton(
     current_user: Utilisateur = Depends(get_current_user)
 ):
     """
-    Réception d'un carton fournisseur.
+    Réception d'un carton fournisseur (ou d'une palette).
     Crée les concentrateurs avec état "en_stock" et affectation "Magasin".
     - Réservé aux rôles admin et magasin
     """
@@ -44,46 +49,23 @@ async def reception_carton(
             detail="Seuls les administrateurs et le personnel magasin peuvent effectuer des réceptions"
         )
     
-    if data.quantite < 1 or data.quantite > 50:
+    if data.quantite < 1 or data.quantite > settings.RECEPTION_MAX_QUANTITE:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="La quantité doit être entre 1 et 50"
+            detail=f"La quantité doit être entre 1 et {settings.RECEPTION_MAX_QUANTITE}"
         )
     
-    created_concentrateurs = []
-    
-    for i in range(data.quantite):
-        # Générer un numéro de série unique
-        numero_serie = f"CPL-{data.operateur[:3].upper()}-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:6].upper()}"
-        
-        concentrateur = Concentrateur(
-            numero_serie=numero_serie,
-            operateur=data.operateur,
-            etat='en_stock',
-            affectation='Magasin',
-            numero_carton=data.numero_carton,
-            date_affectation=datetime.utcnow(),
-            date_dernier_etat=datetime.utcnow(),
-        )
-        db.add(concentrateur)
-        created_concentrateurs.append(numero_serie)
-        
-        # Créer l'action historique
-        action = HistoriqueAction(
-            type_action='reception_magasin',
-            ancien_etat='en_livraison',
-            nouvel_etat='en_stock',
-            ancienne_affectation=None,
-            nouvelle_affectation='Magasin',
-            commentaire=f"Réception carton {data.numero_carton}",
-            scan_qr=False,
-            user_id=current_user.id_utilisateur,
-            concentrateur_id=numero_serie,
-            carton_id=data.numero_carton,
-        )
-        db.add(action)
-    
+    # Insertion en masse: carton, concentrateurs et historique en une requête chacun
+    created_concentrateurs = await receptionner_carton(
+        db,
+        numero_carton=data.numero_carton,
+        operateur=data.operateur,
+        quantite=data.quantite,
+        user_id=current_user.id_utilisateur,
+        base_affectee=current_user.base_affectee
+    )
     await db.commit()
+    invalidate_scans(created_concentrateurs)
     
     return {
         "message": "Réception validée",
@@ -102,6 +84,8 @@ async def transfert_bo(
 ):
     """
     Transfert de concentrateurs du Magasin vers une BO.
+    Lecture, mise à jour et historique en une requête chacun,
+    quelle que soit la taille du lot.
     - Réservé aux rôles admin et magasin
     """
     # Vérifier le rôle
@@ -117,45 +101,83 @@ async def transfert_bo(
             detail="Aucun concentrateur sélectionné"
         )
     
-    transferred = []
-    errors = []
+    # Verrouiller en une requête toutes les lignes concernées, dans un ordre
+    # stable (pas d'interblocage entre deux transferts)
+    serials = list(dict.fromkeys(data.concentrateurs))
+    result = await db.execute(
+        select(Concentrateur.numero_serie, Concentrateur.affectation)
+        .where(in_array(db, Concentrateur.numero_serie, serials))
+        .order_by(Concentrateur.numero_serie)
+        .with_for_update()
+    )
+    affectations = {row.numero_serie: row.affectation for row in result}
     
+    # Erreurs par numéro de série, dans l'ordre de la demande
+    errors = []
+    eligibles = set()
     for numero_serie in data.concentrateurs:
-        # Récupérer le concentrateur
-        result = await db.execute(
-            select(Concentrateur).where(Concentrateur.numero_serie == numero_serie)
-        )
-        concentrateur = result.scalar_one_or_none()
-        
-        if not concentrateur:
+        if numero_serie not in affectations:
             errors.append(f"{numero_serie}: introuvable")
-            continue
-        
-        if concentrateur.affectation != 'Magasin':
+        elif affectations[numero_serie] != 'Magasin' or numero_serie in eligibles:
             errors.append(f"{numero_serie}: pas au Magasin")
-            continue
+        else:
+            eligibles.add(numero_serie)
+    
+    transferred = []
+    if eligibles:
+        now = datetime.utcnow()
         
-        # Mettre à jour le concentrateur
-        ancien_affectation = concentrateur.affectation
-        concentrateur.affectation = data.bo_destination
-        concentrateur.date_affectation = datetime.utcnow()
+        # Mise à jour ensembliste
+        result = await db.execute(
+            update(Concentrateur)
+            .where(
+                in_array(db, Concentrateur.numero_serie, eligibles),
+                Concentrateur.affectation == 'Magasin'
+            )
+            .values(affectation=data.bo_destination, date_affectation=now)
+            .returning(Concentrateur.numero_serie, Concentrateur.etat, Concentrateur.operateur, Concentrateur.hs)
+            .execution_options(synchronize_session=False)
+        )
+        updated = {row.numero_serie: row for row in result}
+        transferred = [numero_serie for numero_serie in serials if numero_serie in updated]
+        
+        # Historique en un seul INSERT
+        await db.execute(
+            insert(HistoriqueAction),
+            [
+                {
+                    "type_action": 'transfert_bo',
+                    "date_action": now,
+                    "ancien_etat": updated[numero_serie].etat,
+                    "nouvel_etat": updated[numero_serie].etat,
+                    "ancienne_affectation": 'Magasin',
+                    "nouvelle_affectation": data.bo_destination,
+                    "commentaire": f"Transfert vers {data.bo_destination}",
+                    "scan_qr": False,
+                    "user_id": current_user.id_utilisateur,
+                    "concentrateur_id": numero_serie,
+                    "created_at": now,
+                }
+                for numero_serie in transferred
+            ]
+        )
         
-        # Créer l'action historique
-        action = HistoriqueAction(
-            type_action='transfert_bo',
-            ancien_etat=concentrateur.etat,
-            nouvel_etat=concentrateur.etat,
-            ancienne_affectation=ancien_affectation,
-            nouvelle_affectation=data.bo_destination,
-            commentaire=f"Transfert vers {data.bo_destination}",
-            scan_qr=False,
-            user_id=current_user.id_utilisateur,
-            concentrateur_id=numero_serie,
+        await apply_counter_changes(db, [
+            (
+                counter_key('Magasin', row.operateur, row.etat, row.hs),
+                counter_key(data.bo_destination, row.operateur, row.etat, row.hs)
+            )
+            for row in updated.values()
+        ])
+        await record_activity(
+            db,
+            [activity_key(now, 'transfert_bo', current_user.base_affectee, current_user.id_utilisateur)],
+            count=len(transferred)
         )
-        db.add(action)
-        transferred.append(numero_serie)
+        await bump_versions(db, CONCENTRATEUR, HISTORIQUE_ACTION)
     
     await db.commit()
+    invalidate_scans(transferred)
     
     return {
         "message": "Transfert effectué",
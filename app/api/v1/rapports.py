@@ -0,0 +1,139 @@
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.api.deps import get_current_active_admin
+from app.models.rapport import Rapport
+from app.models.user import Utilisateur
+from app.services.reports import (
+    FORMAT_PARQUET,
+    create_rapport,
+    generate_actions_report,
+    job_status,
+    parquet_available,
+)
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+
+class RapportActionsRequest(BaseModel):
+    periode_debut: datetime
+    periode_fin: datetime
+    format: str = Field("csv", pattern="^(csv|parquet)$")
+
+
+class RapportResponse(BaseModel):
+    id_rapport: int
+    type_rapport: str
+    periode_debut: Optional[datetime] = None
+    periode_fin: Optional[datetime] = None
+    format: Optional[str] = None
+    statut: str
+    lignes: Optional[int] = None
+    date_generation: Optional[datetime] = None
+    user_id: int
+
+    class Config:
+        from_attributes = True
+
+
+async def _run_actions_report(id_rapport: int) -> None:
+    try:
+        await generate_actions_report(id_rapport)
+    except Exception:
+        # Statut "erreur" déjà enregistré sur le rapport
+        logger.exception("Échec de la génération du rapport %s", id_rapport)
+
+
+@router.post("/historique-actions", status_code=status.HTTP_202_ACCEPTED)
+async def create_rapport_actions(
+    data: RapportActionsRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: Utilisateur = Depends(get_current_active_admin)
+):
+    """
+    Lance la génération de l'historique des actions de la période [debut, fin[
+    en CSV ou Parquet, en tâche de fond. Le Rapport est enregistré aussitôt (statut en_attente),
+    suivi via GET /rapports/jobs/{job_id}, quel que soit le worker.
+    - Réservé aux administrateurs
+    """
+    if data.periode_fin <= data.periode_debut:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="periode_fin doit être postérieure à periode_debut"
+        )
+    
+    if data.format == FORMAT_PARQUET and not parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Format parquet indisponible (paquet pyarrow requis)"
+        )
+    
+    rapport = await create_rapport(
+        db, current_user.id_utilisateur, data.periode_debut, data.periode_fin, data.format
+    )
+    background_tasks.add_task(_run_actions_report, rapport.id_rapport)
+    
+    return job_status(rapport)
+
+
+@router.get("/jobs/{job_id}")
+async def get_rapport_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Utilisateur = Depends(get_current_active_admin)
+):
+    """
+    Statut d'une génération: en_attente, en_cours, termine (id_rapport, lignes) ou erreur.
+    """
+    rapport = await db.get(Rapport, job_id)
+    if rapport is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Génération {job_id} non trouvée"
+        )
+    return job_status(rapport)
+
+
+@router.get("", response_model=List[RapportResponse])
+async def get_rapports(
+    db: AsyncSession = Depends(get_db),
+    current_user: Utilisateur = Depends(get_current_active_admin)
+):
+    """
+    Derniers rapports, générations en cours comprises (statut).
+    """
+    result = await db.execute(
+        select(Rapport).order_by(Rapport.id_rapport.desc()).limit(100)
+    )
+    return result.scalars().all()
+
+
+@router.get("/{id_rapport}/fichier")
+async def download_rapport(
+    id_rapport: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: Utilisateur = Depends(get_current_active_admin)
+):
+    """
+    Télécharge le fichier d'un rapport.
+    """
+    rapport = await db.get(Rapport, id_rapport)
+    if not rapport or not rapport.fichier or not Path(rapport.fichier).is_file():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Fichier du rapport {id_rapport} non trouvé"
+        )
+    
+    return FileResponse(rapport.fichier, filename=Path(rapport.fichier).name)
@@ -1,229 +1,268 @@
-from typing import List
-from fastapi import APIRouter, Depends
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, case, and_
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 
 from app.core.database import get_db
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user_readonly, get_current_active_admin, get_user_bo_filter
+from app.api.etag import conditional_get
+from app.core.singleflight import single_flight_metrics
 from app.models.user import Utilisateur
-from app.models.concentrateur import Concentrateur
-from app.models.action import HistoriqueAction
 from app.models.poste import PosteElectrique
 from app.models.carton import Carton
+from app.models.counter import ConcentrateurCounter
+from app.services.counters import NO_AFFECTATION
+from app.services.actions import list_actions_with_users, action_with_user
+from app.services.activity import actions_on_day, activity_by_day_query
+from app.services.stats_cache import cached_stats
+from app.services.versions import CARTON, CONCENTRATEUR, HISTORIQUE_ACTION, POSTE_ELECTRIQUE, UTILISATEUR
 
 router = APIRouter()
 
 
-@router.get("/overview")
+BO_OPERATIONNELLES = ['BO Nord', 'BO Sud', 'BO Centre']
+
+# Tables lues par /stats/overview (ETag et cache)
+OVERVIEW_TABLES = [CONCENTRATEUR, HISTORIQUE_ACTION, POSTE_ELECTRIQUE, CARTON, UTILISATEUR]
+
+
+def build_overview_query(today: date):
+    """
+    Requête unique du dashboard: agrégats FILTER sur les compteurs
+    matérialisés et sous-requêtes scalaires pour les autres tables.
+    """
+    total = ConcentrateurCounter.total
+
+    def count_etat(etat: str):
+        return func.sum(total).filter(ConcentrateurCounter.etat == etat)
+
+    return select(
+        func.sum(total).label('total_concentrateurs'),
+        count_etat('en_livraison').label('en_livraison'),
+        count_etat('en_stock').label('en_stock'),
+        func.sum(total).filter(and_(
+            ConcentrateurCounter.etat == 'en_stock',
+            ConcentrateurCounter.affectation == 'Magasin'
+        )).label('en_stock_magasin'),
+        func.sum(total).filter(and_(
+            ConcentrateurCounter.etat == 'en_stock',
+            ConcentrateurCounter.affectation.in_(BO_OPERATIONNELLES)
+        )).label('en_stock_bo'),
+        count_etat('pose').label('pose'),
+        count_etat('retour_constructeur').label('retour_constructeur'),
+        count_etat('hs').label('hs'),
+        actions_on_day(today).label('actions_today'),
+        select(func.count()).select_from(PosteElectrique).scalar_subquery().label('total_postes'),
+        select(func.count()).select_from(Carton).scalar_subquery().label('total_cartons'),
+        select(func.count()).select_from(Utilisateur).scalar_subquery().label('total_utilisateurs'),
+    ).select_from(ConcentrateurCounter)
+
+
+@router.get(
+    "/overview",
+    dependencies=[Depends(conditional_get(OVERVIEW_TABLES, max_age=10))]
+)
 async def get_stats_overview(
     db: AsyncSession = Depends(get_db),
-    current_user: Utilisateur = Depends(get_current_user)
+    current_user: Utilisateur = Depends(get_current_user_readonly)
 ):
     """
     Statistiques globales pour le dashboard.
+    Un seul aller-retour vers la base, résultat en cache jusqu'à la prochaine écriture.
     """
-    # Total concentrateurs
-    result = await db.execute(select(func.count()).select_from(Concentrateur))
-    total = result.scalar() or 0
-    
-    # Par état
-    result = await db.execute(
-        select(Concentrateur.etat, func.count())
-        .group_by(Concentrateur.etat)
-    )
-    etats = {row[0]: row[1] for row in result}
-    
-    # En stock par affectation (Magasin vs BO)
-    result = await db.execute(
-        select(func.count())
-        .where(and_(
-            Concentrateur.etat == 'en_stock',
-            Concentrateur.affectation == 'Magasin'
-        ))
-    )
-    en_stock_magasin = result.scalar() or 0
-    
-    result = await db.execute(
-        select(func.count())
-        .where(and_(
-            Concentrateur.etat == 'en_stock',
-            Concentrateur.affectation.in_(['BO Nord', 'BO Sud', 'BO Centre'])
-        ))
-    )
-    en_stock_bo = result.scalar() or 0
-    
-    # Actions aujourd'hui
-    today = datetime.utcnow().date()
-    result = await db.execute(
-        select(func.count())
-        .select_from(HistoriqueAction)
-        .where(func.date(HistoriqueAction.date_action) == today)
-    )
-    actions_today = result.scalar() or 0
-    
-    # Totaux par table
-    result = await db.execute(select(func.count()).select_from(PosteElectrique))
-    total_postes = result.scalar() or 0
-    
-    result = await db.execute(select(func.count()).select_from(Carton))
-    total_cartons = result.scalar() or 0
-    
-    result = await db.execute(select(func.count()).select_from(Utilisateur))
-    total_utilisateurs = result.scalar() or 0
+    async def compute():
+        today = datetime.utcnow().date()
+        result = await db.execute(build_overview_query(today))
+        row = result.mappings().one()
+        
+        return {key: value or 0 for key, value in row.items()}
     
-    return {
-        "total_concentrateurs": total,
-        "en_livraison": etats.get('en_livraison', 0),
-        "en_stock": etats.get('en_stock', 0),
-        "en_stock_magasin": en_stock_magasin,
-        "en_stock_bo": en_stock_bo,
-        "pose": etats.get('pose', 0),
-        "retour_constructeur": etats.get('retour_constructeur', 0),
-        "hs": etats.get('hs', 0),
-        "actions_today": actions_today,
-        "total_postes": total_postes,
-        "total_cartons": total_cartons,
-        "total_utilisateurs": total_utilisateurs
-    }
-
-
-@router.get("/stocks-par-base")
+    return await cached_stats(db, "overview", OVERVIEW_TABLES, compute)
+
+
+@router.get("/stocks-par-base", dependencies=[Depends(conditional_get([CONCENTRATEUR], max_age=10))])
 async def get_stocks_par_base(
     db: AsyncSession = Depends(get_db),
-    current_user: Utilisateur = Depends(get_current_user)
+    current_user: Utilisateur = Depends(get_current_user_readonly)
 ):
     """
     Répartition des stocks par base opérationnelle.
     """
-    # Total global pour calculer les pourcentages
-    result = await db.execute(select(func.count()).select_from(Concentrateur))
-    total_global = result.scalar() or 1  # Éviter division par zéro
-    
-    # Stats par affectation
-    result = await db.execute(
-        select(
-            Concentrateur.affectation,
-            func.count().label('total'),
-            func.sum(case((Concentrateur.etat == 'en_livraison', 1), else_=0)).label('en_livraison'),
-            func.sum(case((Concentrateur.etat == 'en_stock', 1), else_=0)).label('en_stock'),
-            func.sum(case((Concentrateur.etat == 'pose', 1), else_=0)).label('pose'),
-            func.sum(case((Concentrateur.etat == 'retour_constructeur', 1), else_=0)).label('retour_constructeur'),
-            func.sum(case((Concentrateur.etat == 'hs', 1), else_=0)).label('hs')
+    async def compute():
+        # Total global pour calculer les pourcentages
+        result = await db.execute(select(func.sum(ConcentrateurCounter.total)))
+        total_global = result.scalar() or 1  # Éviter division par zéro
+        
+        # Stats par affectation
+        total = ConcentrateurCounter.total
+        etat = ConcentrateurCounter.etat
+        result = await db.execute(
+            select(
+                ConcentrateurCounter.affectation,
+                func.sum(total).label('total'),
+                func.sum(case((etat == 'en_livraison', total), else_=0)).label('en_livraison'),
+                func.sum(case((etat == 'en_stock', total), else_=0)).label('en_stock'),
+                func.sum(case((etat == 'pose', total), else_=0)).label('pose'),
+                func.sum(case((etat == 'retour_constructeur', total), else_=0)).label('retour_constructeur'),
+                func.sum(case((etat == 'hs', total), else_=0)).label('hs')
+            )
+            .where(ConcentrateurCounter.affectation != NO_AFFECTATION)
+            .group_by(ConcentrateurCounter.affectation)
+            .having(func.sum(total) > 0)
+            .order_by(func.sum(total).desc())
         )
-        .where(Concentrateur.affectation.isnot(None))
-        .group_by(Concentrateur.affectation)
-        .order_by(func.count().desc())
-    )
-    
-    stocks = []
-    for row in result:
-        total = row[1] or 0
-        stocks.append({
-            "base_operationnelle": row[0],
-            "total": total,
-            "en_livraison": row[2] or 0,
-            "en_stock": row[3] or 0,
-            "pose": row[4] or 0,
-            "retour_constructeur": row[5] or 0,
-            "hs": row[6] or 0,
-            "percentage": round((total / total_global) * 100, 1) if total_global > 0 else 0
-        })
+        
+        stocks = []
+        for row in result:
+            total = row[1] or 0
+            stocks.append({
+                "base_operationnelle": row[0],
+                "total": total,
+                "en_livraison": row[2] or 0,
+                "en_stock": row[3] or 0,
+                "pose": row[4] or 0,
+                "retour_constructeur": row[5] or 0,
+                "hs": row[6] or 0,
+                "percentage": round((total / total_global) * 100, 1) if total_global > 0 else 0
+            })
+        
+        return stocks
     
-    return stocks
+    return await cached_stats(db, "stocks-par-base", [CONCENTRATEUR], compute)
 
 
-@router.get("/actions-recentes")
+@router.get("/actions-recentes", dependencies=[Depends(conditional_get([HISTORIQUE_ACTION]))])
 async def get_actions_recentes(
-    limit: int = 10,
+    response: Response,
+    limit: int = Query(10, ge=1, le=100),
+    before: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
-    current_user: Utilisateur = Depends(get_current_user)
+    current_user: Utilisateur = Depends(get_current_user_readonly)
 ):
     """
-    Dernières actions effectuées.
+    Dernières actions effectuées, avec leur utilisateur (une seule requête).
+    - before: curseur de l'en-tête X-Next-Cursor de la réponse précédente
     """
-    result = await db.execute(
-        select(HistoriqueAction)
-        .order_by(HistoriqueAction.date_action.desc())
-        .limit(limit)
+    async def compute():
+        actions, next_cursor = await list_actions_with_users(db, limit=limit, before=before)
+        return {
+            "actions": [action_with_user(action) for action in actions],
+            "next_cursor": next_cursor
+        }
+    
+    page = await cached_stats(
+        db, "actions-recentes", [HISTORIQUE_ACTION], compute,
+        params={"limit": limit, "before": before}
     )
-    actions = result.scalars().all()
     
-    # Enrichir avec les infos utilisateur
-    actions_enrichies = []
-    for action in actions:
-        # Récupérer l'utilisateur
-        user_result = await db.execute(
-            select(Utilisateur).where(Utilisateur.id_utilisateur == action.user_id)
-        )
-        user = user_result.scalar_one_or_none()
-        
-        actions_enrichies.append({
-            "id_action": action.id_action,
-            "type_action": action.type_action,
-            "date_action": action.date_action,
-            "ancien_etat": action.ancien_etat,
-            "nouvel_etat": action.nouvel_etat,
-            "ancienne_affectation": action.ancienne_affectation,
-            "nouvelle_affectation": action.nouvelle_affectation,
-            "commentaire": action.commentaire,
-            "concentrateur_id": action.concentrateur_id,
-            "user": {
-                "id": user.id_utilisateur if user else None,
-                "nom": user.nom if user else "Inconnu",
-                "prenom": user.prenom if user else "",
-                "role": user.role if user else None
-            } if user else None
-        })
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
     
-    return actions_enrichies
+    return page["actions"]
 
 
-@router.get("/par-operateur")
+@router.get("/par-operateur", dependencies=[Depends(conditional_get([CONCENTRATEUR], max_age=10))])
 async def get_stats_par_operateur(
     db: AsyncSession = Depends(get_db),
-    current_user: Utilisateur = Depends(get_current_user)
+    current_user: Utilisateur = Depends(get_current_user_readonly)
 ):
     """
     Répartition des concentrateurs par opérateur.
     """
-    result = await db.execute(
-        select(
-            Concentrateur.operateur,
-            func.count().label('total'),
-            func.sum(case((Concentrateur.etat == 'en_stock', 1), else_=0)).label('en_stock'),
-            func.sum(case((Concentrateur.etat == 'pose', 1), else_=0)).label('pose'),
-            func.sum(case((Concentrateur.hs == True, 1), else_=0)).label('hs')
+    async def compute():
+        total = ConcentrateurCounter.total
+        result = await db.execute(
+            select(
+                ConcentrateurCounter.operateur,
+                func.sum(total).label('total'),
+                func.sum(case((ConcentrateurCounter.etat == 'en_stock', total), else_=0)).label('en_stock'),
+                func.sum(case((ConcentrateurCounter.etat == 'pose', total), else_=0)).label('pose'),
+                func.sum(case((ConcentrateurCounter.hs == True, total), else_=0)).label('hs')
+            )
+            .group_by(ConcentrateurCounter.operateur)
+            .having(func.sum(total) > 0)
+            .order_by(func.sum(total).desc())
         )
-        .group_by(Concentrateur.operateur)
-        .order_by(func.count().desc())
-    )
+        
+        operateurs = []
+        for row in result:
+            operateurs.append({
+                "operateur": row[0],
+                "total": row[1] or 0,
+                "en_stock": row[2] or 0,
+                "pose": row[3] or 0,
+                "hs": row[4] or 0
+            })
+        
+        return operateurs
+    
+    return await cached_stats(db, "par-operateur", [CONCENTRATEUR], compute)
+
+
+@router.get("/activite-par-jour", dependencies=[Depends(conditional_get([HISTORIQUE_ACTION], max_age=10))])
+async def get_activite_par_jour(
+    jours: int = Query(30, ge=1, le=366),
+    db: AsyncSession = Depends(get_db),
+    current_user: Utilisateur = Depends(get_current_user_readonly)
+):
+    """
+    Nombre d'actions par jour et par type sur les `jours` derniers jours,
+    lu dans les agrégats journaliers (jours sans action inclus).
+    - Admin: toutes les BOs
+    - Autres rôles: actions des utilisateurs de leur BO
+    """
+    bo_filter = get_user_bo_filter(current_user)
     
-    operateurs = []
-    for row in result:
-        operateurs.append({
-            "operateur": row[0],
-            "total": row[1] or 0,
-            "en_stock": row[2] or 0,
-            "pose": row[3] or 0,
-            "hs": row[4] or 0
-        })
+    async def compute():
+        today = datetime.utcnow().date()
+        debut = today - timedelta(days=jours - 1)
+        result = await db.execute(activity_by_day_query(debut, today + timedelta(days=1), bo_filter))
+        
+        par_jour = {}
+        for jour, type_action, total in result:
+            par_jour.setdefault(jour, {})[type_action] = total
+        
+        activite = []
+        for offset in range(jours):
+            jour = debut + timedelta(days=offset)
+            par_type = par_jour.get(jour, {})
+            activite.append({"jour": jour, "total": sum(par_type.values()), "par_type": par_type})
+        return activite
     
-    return operateurs
+    return await cached_stats(
+        db, "activite-par-jour", [HISTORIQUE_ACTION], compute,
+        scope=bo_filter, params={"jours": jours}
+    )
 
 
-@router.get("/postes-par-bo")
+@router.get("/postes-par-bo", dependencies=[Depends(conditional_get([POSTE_ELECTRIQUE], max_age=60))])
 async def get_postes_par_bo(
     db: AsyncSession = Depends(get_db),
-    current_user: Utilisateur = Depends(get_current_user)
+    current_user: Utilisateur = Depends(get_current_user_readonly)
 ):
     """
     Répartition des postes électriques par BO.
     """
-    result = await db.execute(
-        select(PosteElectrique.bo_affectee, func.count())
-        .group_by(PosteElectrique.bo_affectee)
-        .order_by(func.count().desc())
-    )
+    async def compute():
+        result = await db.execute(
+            select(PosteElectrique.bo_affectee, func.count())
+            .group_by(PosteElectrique.bo_affectee)
+            .order_by(func.count().desc())
+        )
+        
+        return [{"bo": row[0], "count": row[1]} for row in result]
     
-    return [{"bo": row[0], "count": row[1]} for row in result]
+    return await cached_stats(db, "postes-par-bo", [POSTE_ELECTRIQUE], compute)
+
+
+@router.get("/single-flight")
+async def get_single_flight_metrics(
+    current_user: Utilisateur = Depends(get_current_active_admin)
+):
+    """
+    Requêtes regroupées depuis le démarrage du processus, par endpoint:
+    executions (requêtes SQL réellement lancées) et deduplicated (requêtes
+    servies par une exécution déjà en cours).
+    """
+    return single_flight_metrics()
@@ -0,0 +1,122 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Cache en mémoire (par processus) avec expiration et éviction LRU.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_MISSING = object()
+
+
+class MemoryCacheBackend:
+    """
+    Backend de cache asynchrone en mémoire (par processus), sur TTLCache.
+    Interface commune des backends: get / set / delete / clear.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self._cache = TTLCache(ttl=ttl, maxsize=maxsize)
+
+    async def get(self, key: str) -> Any:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    async def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+    async def clear(self) -> None:
+        self._cache.clear()
+
+
+class RedisCacheBackend:
+    """
+    Backend de cache partagé entre processus (Redis, paquet `redis` optionnel).
+    Les valeurs sont stockées en JSON: elles doivent être sérialisables
+    par FastAPI (dict, listes, dates...).
+    """
+
+    def __init__(self, url: str, ttl: float, prefix: str = "cache:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("RESULT_CACHE_BACKEND=redis nécessite le paquet redis") from exc
+        self._client = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Any:
+        raw = await self._client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        from fastapi.encoders import jsonable_encoder
+        await self._client.set(
+            self.prefix + key,
+            json.dumps(jsonable_encoder(value)),
+            px=int((self.ttl if ttl is None else ttl) * 1000)
+        )
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self.prefix + key)
+
+    async def clear(self) -> None:
+        async for key in self._client.scan_iter(match=self.prefix + "*"):
+            await self._client.delete(key)
+
+
+def build_cache_backend(name: str, ttl: float, maxsize: int, namespace: str):
+    """
+    Backend de cache selon son nom (RESULT_CACHE_BACKEND):
+    - memory: cache par processus
+    - redis: cache partagé (REDIS_URL)
+    """
+    if name == "memory":
+        return MemoryCacheBackend(ttl=ttl, maxsize=maxsize)
+    if name == "redis":
+        from app.core.config import settings
+        if not settings.REDIS_URL:
+            raise RuntimeError("RESULT_CACHE_BACKEND=redis nécessite REDIS_URL")
+        return RedisCacheBackend(settings.REDIS_URL, ttl=ttl, prefix=f"{namespace}:")
+    raise ValueError(f"Backend de cache inconnu: {name} (attendu: memory, redis)")
@@ -1,15 +1,71 @@
 from pydantic_settings import BaseSettings
+from typing import List, Optional
 from functools import lru_cache
 
 
 class Settings(BaseSettings):
     # Database (connexion directe via URI)
     DATABASE_URL: str
+
+    # Mode de déploiement: "server" (workers uvicorn), "serverless" (Vercel) ou "auto"
+    DEPLOYMENT_MODE: str = "auto"
+
+    # Pool de connexions (mode server uniquement)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: int = 10
+    DB_POOL_RECYCLE: int = 300
+    DB_POOL_WARMUP: int = 2
+    DB_ECHO: bool = False
+
+    # Cache des totaux de pagination (count_mode=estimated)
+    COUNT_CACHE_TTL_SECONDS: int = 30
+
+    # Cache des résultats de statistiques: "memory" (par processus) ou "redis" (partagé)
+    RESULT_CACHE_BACKEND: str = "memory"
+    REDIS_URL: Optional[str] = None
+    STATS_CACHE_TTL_SECONDS: int = 60
+    STATS_CACHE_MAXSIZE: int = 1024
+
+    # Recherche: préfixes communs à tous les numéros de série (recherche par préfixe)
+    SEARCH_SERIAL_PREFIXES: List[str] = ["CPL-"]
+
+    # Cache des scans QR (/concentrateurs/verify), invalidé à chaque écriture
+    SCAN_CACHE_TTL_SECONDS: int = 10
+    SCAN_CACHE_MAXSIZE: int = 50000
+
+    # Rapports générés (fichiers CSV / Parquet)
+    RAPPORTS_DIR: str = "rapports"
+
+    # historique_action partitionnée par mois (Postgres): partitions créées
+    # à l'avance et rétention avant détachement (0 = conserver tout)
+    HISTORIQUE_PARTITIONS_AHEAD: int = 3
+    HISTORIQUE_RETENTION_MONTHS: int = 24
+
+    # Réception magasin: nombre maximum de concentrateurs par réception (palette)
+    RECEPTION_MAX_QUANTITE: int = 10000
     
     # JWT
     SECRET_KEY: str = "your-secret-key-min-32-chars-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Refresh tokens: durée de vie, renouvelée à chaque rafraîchissement
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # Implémentation JWT: "jose" (python-jose) ou "pyjwt" (paquet PyJWT, optionnel)
+    JWT_BACKEND: str = "jose"
+    # Cache des tokens déjà vérifiés, borné par leur exp (0 = désactivé)
+    TOKEN_CACHE_TTL_SECONDS: int = 300
+    TOKEN_CACHE_MAXSIZE: int = 10000
+
+    # Mots de passe: coût bcrypt et nombre de hachages simultanés (threads dédiés)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_CONCURRENCY: int = 4
+
+    # Cache des utilisateurs authentifiés (0 = désactivé)
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAXSIZE: int = 10000
+    # Endpoints en lecture seule: utiliser le rôle et la BO du token sans requête
+    AUTH_TRUST_TOKEN_CLAIMS: bool = False
     
     # CORS
     FRONTEND_URL: str = "http://localhost:5173"
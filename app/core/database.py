@@ -1,51 +1,157 @@
-# from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-# from sqlalchemy.orm import sessionmaker
-# from sqlalchemy.ext.declarative import declarative_base
+import asyncio
+import os
+import uuid
+from typing import Optional, Sequence
 
-# from app.core.config import settings
+from sqlalchemy import any_, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
-# engine = create_async_engine(
-#     settings.DATABASE_URL,
-#     echo=True,
-#     future=True
-# )
+from app.core.config import settings
 
-# AsyncSessionLocal = sessionmaker(
-#     engine, class_=AsyncSession, expire_on_commit=False
-# )
+MODE_SERVER = "server"
+MODE_SERVERLESS = "serverless"
 
-# Base = declarative_base()
+Base = declarative_base()
 
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker] = None
 
-# async def get_db():
-#     async with AsyncSessionLocal() as session:
-#         try:
-#             yield session
-#         finally:
-#             await session.close()
 
-# from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-# from sqlalchemy.orm import sessionmaker
-# from sqlalchemy.ext.declarative import declarative_base
+def get_deployment_mode() -> str:
+    """
+    Détermine le mode de déploiement.
+    - "server": workers uvicorn longue durée, pool borné et préchauffé
+    - "serverless": Vercel derrière PgBouncer / pooler Supabase, pas de pool local
+    """
+    mode = settings.DEPLOYMENT_MODE.lower()
+    if mode in (MODE_SERVER, MODE_SERVERLESS):
+        return mode
+    # Détection automatique (Vercel positionne VERCEL=1)
+    if os.environ.get("VERCEL") or os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+        return MODE_SERVERLESS
+    return MODE_SERVER
 
-# from app.core.config import settings
 
-# engine = create_async_engine(
-#     settings.DATABASE_URL,
-#     pool_pre_ping=True,   # évite connexions mortes
-#     pool_recycle=300,     # recycle les connexions
-#     echo=False            # IMPORTANT en prod / serverless
-# )
+def build_engine(url: Optional[str] = None, mode: Optional[str] = None) -> AsyncEngine:
+    """
+    Construit un engine async configuré selon le mode de déploiement.
+    """
+    url = url or settings.DATABASE_URL
+    mode = mode or get_deployment_mode()
+    is_asyncpg = make_url(url).get_driver_name() == "asyncpg"
 
-# AsyncSessionLocal = sessionmaker(
-#     engine,
-#     class_=AsyncSession,
-#     expire_on_commit=False
-# )
+    if mode == MODE_SERVERLESS:
+        connect_args = {}
+        if is_asyncpg:
+            # PgBouncer en mode transaction ne supporte pas les prepared statements nommés
+            connect_args = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4().hex}__",
+            }
+        return create_async_engine(
+            url,
+            poolclass=NullPool,
+            connect_args=connect_args,
+            echo=settings.DB_ECHO,
+        )
 
-# Base = declarative_base()
+    if not is_asyncpg:
+        # SQLite & co: pool par défaut du dialecte
+        return create_async_engine(url, echo=settings.DB_ECHO)
 
+    return create_async_engine(
+        url,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,   # évite connexions mortes
+        echo=settings.DB_ECHO,
+    )
 
-# async def get_db():
-#     async with AsyncSessionLocal() as session:
-#         yield session
+
+def get_engine() -> AsyncEngine:
+    """
+    Retourne l'engine, créé au premier appel (aucune socket ouverte au cold start).
+    """
+    global _engine
+    if _engine is None:
+        _engine = build_engine()
+    return _engine
+
+
+def get_sessionmaker() -> async_sessionmaker:
+    global _sessionmaker
+    if _sessionmaker is None:
+        _sessionmaker = async_sessionmaker(
+            get_engine(),
+            class_=AsyncSession,
+            expire_on_commit=False
+        )
+    return _sessionmaker
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    return get_sessionmaker()()
+
+
+def upsert(db: AsyncSession, table):
+    """
+    INSERT supportant ON CONFLICT pour le dialecte de la session (Postgres, SQLite).
+    """
+    dialect_name = db.bind.dialect.name
+    if dialect_name == "postgresql":
+        return postgresql.insert(table)
+    if dialect_name == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"Upsert non supporté pour {dialect_name}")
+
+
+def in_array(db: AsyncSession, column, values: Sequence):
+    """
+    column = ANY(:valeurs) avec un seul paramètre tableau sous Postgres:
+    même texte SQL quelle que soit la taille de la liste (cache des requêtes
+    préparées) et pas de limite de 32767 paramètres. IN (...) ailleurs.
+    """
+    if db.bind.dialect.name == "postgresql":
+        return column == any_(bindparam(None, list(values), type_=postgresql.ARRAY(column.type)))
+    return column.in_(list(values))
+
+
+async def get_db():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async def warmup_pool(size: Optional[int] = None, engine: Optional[AsyncEngine] = None) -> int:
+    """
+    Ouvre des connexions à l'avance pour que les premières requêtes
+    ne paient pas le handshake TCP+TLS+auth. Sans effet en serverless.
+    """
+    if engine is None:
+        if get_deployment_mode() == MODE_SERVERLESS:
+            return 0
+        engine = get_engine()
+    if not isinstance(engine.pool, AsyncAdaptedQueuePool):
+        return 0
+    size = min(size if size is not None else settings.DB_POOL_WARMUP, settings.DB_POOL_SIZE)
+    if size <= 0:
+        return 0
+    connections = await asyncio.gather(*(engine.connect() for _ in range(size)))
+    for conn in connections:
+        await conn.close()
+    return len(connections)
+
+
+async def dispose_engine() -> None:
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _sessionmaker = None
@@ -1,12 +1,27 @@
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+# bcrypt libère le GIL: un pool de threads borné suffit à ne pas bloquer la boucle
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_CONCURRENCY,
+    thread_name_prefix="password-hash"
+)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -17,6 +32,87 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_password_task(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, func, *args)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password exécuté hors de la boucle d'événements."""
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash exécuté hors de la boucle d'événements."""
+    return await _run_password_task(get_password_hash, password)
+
+
+async def verify_and_update_password(
+    plain_password: str,
+    hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Vérifie le mot de passe hors de la boucle d'événements.
+    Retourne (valide, nouveau_hash): nouveau_hash est renseigné quand le hash
+    stocké doit être régénéré (coût BCRYPT_ROUNDS modifié, schéma obsolète).
+    """
+    return await _run_password_task(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+class InvalidTokenError(Exception):
+    """Token illisible, mal signé ou expiré (quel que soit le backend)."""
+
+
+def _jose_encode(claims: dict) -> str:
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def _jose_decode(token: str) -> dict:
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError as exc:
+        raise InvalidTokenError(str(exc)) from exc
+
+
+def _pyjwt_encode(claims: dict) -> str:
+    import jwt as pyjwt
+    return pyjwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def _pyjwt_decode(token: str) -> dict:
+    import jwt as pyjwt
+    try:
+        return pyjwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except pyjwt.PyJWTError as exc:
+        raise InvalidTokenError(str(exc)) from exc
+
+
+# Backends JWT: nom -> (encode(claims), decode(token))
+JWT_BACKENDS: Dict[str, Tuple[Callable[[dict], str], Callable[[str], dict]]] = {
+    "jose": (_jose_encode, _jose_decode),
+    "pyjwt": (_pyjwt_encode, _pyjwt_decode),
+}
+
+
+def get_jwt_backend(name: Optional[str] = None) -> Tuple[Callable[[dict], str], Callable[[str], dict]]:
+    """Backend JWT configuré (JWT_BACKEND), ou celui nommé."""
+    name = name or settings.JWT_BACKEND
+    if name not in JWT_BACKENDS:
+        raise ValueError(f"JWT_BACKEND inconnu: {name} (attendu: {', '.join(JWT_BACKENDS)})")
+    if name == "pyjwt":
+        try:
+            import jwt as pyjwt  # noqa: F401
+        except ImportError as exc:
+            raise RuntimeError("JWT_BACKEND=pyjwt nécessite le paquet PyJWT") from exc
+    return JWT_BACKENDS[name]
+
+
+_jwt_encode, _jwt_decode = get_jwt_backend()
+
+# Payloads des tokens déjà vérifiés, clé = empreinte SHA-256 du token
+_token_cache = TTLCache(ttl=settings.TOKEN_CACHE_TTL_SECONDS, maxsize=settings.TOKEN_CACHE_MAXSIZE)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -24,13 +120,32 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = _jwt_encode(to_encode)
     return encoded_jwt
 
 
 def decode_access_token(token: str) -> Optional[dict]:
+    """
+    Payload du token, ou None s'il est invalide ou expiré.
+    Un token déjà vérifié est servi depuis le cache sans revérifier
+    la signature, jusqu'à son exp au plus tard.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = _token_cache.get(digest)
+    if payload is not None:
+        if payload["exp"] > time.time():
+            return dict(payload)
+        _token_cache.delete(digest)
+        return None
+
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
-    except JWTError:
+        payload = _jwt_decode(token)
+    except InvalidTokenError:
         return None
+
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        ttl = min(settings.TOKEN_CACHE_TTL_SECONDS, exp - time.time())
+        if ttl > 0:
+            _token_cache.set(digest, dict(payload), ttl=ttl)
+    return payload
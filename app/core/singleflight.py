@@ -0,0 +1,74 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Regroupe les appels concurrents de même clé: le premier exécute la
+    fonction, les suivants attendent son résultat (ou son exception).
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # Appels exécutés / appels servis par un appel déjà en cours
+        self.executions = 0
+        self.deduplicated = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.deduplicated += 1
+            try:
+                # shield: l'annulation d'un appelant en attente n'annule pas l'appel partagé
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    # Appelant exécutant annulé (client déconnecté): reprendre l'appel
+                    return await self.do(key, fn)
+                raise
+
+        self.executions += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Évite l'avertissement "exception never retrieved" sans appelant en attente
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "executions": self.executions,
+            "deduplicated": self.deduplicated,
+            "inflight": len(self._inflight),
+        }
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+# Instances nommées (une par endpoint ou usage), pour les métriques
+_flights: Dict[str, SingleFlight] = {}
+
+
+def get_flight(name: str) -> SingleFlight:
+    """SingleFlight nommé, créé au premier appel."""
+    flight = _flights.get(name)
+    if flight is None:
+        flight = _flights[name] = SingleFlight()
+    return flight
+
+
+def single_flight_metrics() -> Dict[str, Dict[str, int]]:
+    """Métriques de chaque SingleFlight nommé."""
+    return {name: flight.metrics() for name, flight in sorted(_flights.items())}
@@ -1,15 +1,56 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.exc import DBAPIError
 
 from app.core.config import settings
+from app.core.database import (
+    AsyncSessionLocal, MODE_SERVERLESS, dispose_engine, get_deployment_mode, warmup_pool
+)
 from app.api.v1 import api_router
+from app.services.partitions import ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+
+async def prepare_partitions() -> None:
+    """
+    Partitions de historique_action des prochains mois (mode server uniquement;
+    en serverless: python -m scripts.partitions planifié).
+    """
+    if get_deployment_mode() == MODE_SERVERLESS:
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            await ensure_partitions(db)
+            await db.commit()
+    except (DBAPIError, OSError):
+        # Base injoignable ou migration 007 pas encore appliquée: le démarrage ne doit pas échouer
+        logger.warning("Partitions historique_action non créées (base injoignable ou migration 007 absente)", exc_info=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Préchauffage du pool (mode server uniquement): une base momentanément
+    # injoignable ne doit pas empêcher le démarrage, le pool se remplira à la demande
+    try:
+        await warmup_pool()
+    except (DBAPIError, OSError):
+        logger.warning("Préchauffage du pool impossible, base injoignable", exc_info=True)
+    await prepare_partitions()
+    yield
+    await dispose_engine()
+
 
 app = FastAPI(
     title="EDF Corse - Gestion Concentrateurs CPL",
     description="API de gestion des concentrateurs CPL pour EDF Corse",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configuration CORS
@@ -24,10 +65,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Curseur de pagination de /stats/actions-recentes, lisible par le frontend
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Inclusion des routes API
-# app.include_router(api_router, prefix="/api/v1")
+app.include_router(api_router, prefix="/api/v1")
 
 
 @app.get("/")
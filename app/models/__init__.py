@@ -6,6 +6,11 @@ from app.models.commande import CommandeBo
 from app.models.action import HistoriqueAction
 from app.models.notification import Notification
 from app.models.rapport import Rapport
+from app.models.counter import ConcentrateurCounter
+from app.models.activity import ActionDailyCount
+from app.models.idempotency import ActionIdempotency
+from app.models.refresh_token import RefreshToken
+from app.models.table_version import TableVersion
 
 __all__ = [
     "Utilisateur",
@@ -15,5 +20,10 @@ __all__ = [
     "CommandeBo",
     "HistoriqueAction",
     "Notification",
-    "Rapport"
+    "Rapport",
+    "ConcentrateurCounter",
+    "ActionDailyCount",
+    "ActionIdempotency",
+    "RefreshToken",
+    "TableVersion"
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -7,10 +7,20 @@ from app.core.database import Base
 
 class HistoriqueAction(Base):
     __tablename__ = "historique_action"
+    __table_args__ = (
+        # Pagination par curseur (date_action, id_action)
+        Index("ix_historique_action_date_id", "date_action", "id_action"),
+        Index("ix_historique_action_user_date_id", "user_id", "date_action", "id_action"),
+        # Dernières actions d'un concentrateur (détail, historique paginé)
+        Index(
+            "ix_historique_action_concentrateur_date_id",
+            "concentrateur_id", text("date_action DESC"), text("id_action DESC")
+        ),
+    )
 
-    id_action = Column(Integer, primary_key=True, index=True)
+    id_action = Column(Integer, primary_key=True)
     type_action = Column(String(100), nullable=False, index=True)
-    date_action = Column(DateTime, default=datetime.utcnow, index=True)
+    date_action = Column(DateTime, default=datetime.utcnow, nullable=False)
     ancien_etat = Column(String(50), nullable=True)
     nouvel_etat = Column(String(50), nullable=True)
     ancienne_affectation = Column(String(100), nullable=True)
@@ -18,10 +28,12 @@ class HistoriqueAction(Base):
     commentaire = Column(Text, nullable=True)
     scan_qr = Column(Boolean, default=False)
     photo = Column(String(500), nullable=True)
+    # Unicité garantie par action_idempotency (table partitionnée)
+    idempotency_key = Column(String(100), nullable=True)
     
     # Foreign Keys
-    user_id = Column(Integer, ForeignKey("utilisateur.id_utilisateur"), nullable=False, index=True)
-    concentrateur_id = Column(String(50), ForeignKey("concentrateur.numero_serie"), nullable=True, index=True)
+    user_id = Column(Integer, ForeignKey("utilisateur.id_utilisateur"), nullable=False)
+    concentrateur_id = Column(String(50), ForeignKey("concentrateur.numero_serie"), nullable=True)
     carton_id = Column(String(50), ForeignKey("carton.numero_carton"), nullable=True)
     poste_id = Column(Integer, ForeignKey("poste_electrique.id_poste"), nullable=True)
     
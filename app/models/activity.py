@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime
+from datetime import datetime
+
+from app.core.database import Base
+
+
+class ActionDailyCount(Base):
+    """
+    Nombre d'actions par (jour, type_action, BO, utilisateur).
+    Maintenu dans la même transaction que les insertions dans historique_action.
+    """
+    __tablename__ = "action_daily_counts"
+
+    jour = Column(Date, primary_key=True)
+    type_action = Column(String(100), primary_key=True)
+    # BO de l'utilisateur au moment de l'action, chaîne vide si aucune
+    bo = Column(String(100), primary_key=True, default="")
+    user_id = Column(Integer, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
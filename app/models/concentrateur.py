@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Text, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -7,13 +7,60 @@ from app.core.database import Base
 
 class Concentrateur(Base):
     __tablename__ = "concentrateur"
+    __table_args__ = (
+        # Pagination par curseur (date_dernier_etat, numero_serie): liste sans filtre,
+        # parcours arrière pour l'ordre DESC NULLS FIRST
+        Index("ix_concentrateur_dernier_etat_serie", "date_dernier_etat", "numero_serie"),
+        # Filtres de la liste (BO, état, opérateur) suivis de l'ordre de pagination:
+        # les lignes d'une page se lisent dans l'ordre de l'index, sans tri
+        Index(
+            "ix_concentrateur_affectation_dernier_etat",
+            "affectation", text("date_dernier_etat DESC"), text("numero_serie DESC")
+        ),
+        Index(
+            "ix_concentrateur_affectation_etat_dernier_etat",
+            "affectation", "etat", text("date_dernier_etat DESC"), text("numero_serie DESC")
+        ),
+        Index(
+            "ix_concentrateur_affectation_operateur_dernier_etat",
+            "affectation", "operateur", text("date_dernier_etat DESC"), text("numero_serie DESC")
+        ),
+        Index(
+            "ix_concentrateur_etat_dernier_etat",
+            "etat", text("date_dernier_etat DESC"), text("numero_serie DESC")
+        ),
+        Index(
+            "ix_concentrateur_operateur_dernier_etat",
+            "operateur", text("date_dernier_etat DESC"), text("numero_serie DESC")
+        ),
+        # Stock magasin (réception, transferts vers les BO)
+        Index(
+            "ix_concentrateur_magasin_en_stock",
+            text("date_dernier_etat DESC"), text("numero_serie DESC"),
+            postgresql_where=text("etat = 'en_stock' AND affectation = 'Magasin'")
+        ),
+        # Recherche "contient" (ILIKE '%terme%') et préfixe de numéro de série
+        # (LIKE 'CPL-ITR-%'), extension pg_trgm
+        Index(
+            "ix_concentrateur_numero_serie_trgm", "numero_serie",
+            postgresql_using="gin", postgresql_ops={"numero_serie": "gin_trgm_ops"}
+        ),
+        Index(
+            "ix_concentrateur_numero_carton_trgm", "numero_carton",
+            postgresql_using="gin", postgresql_ops={"numero_carton": "gin_trgm_ops"}
+        ),
+        Index(
+            "ix_concentrateur_operateur_trgm", "operateur",
+            postgresql_using="gin", postgresql_ops={"operateur": "gin_trgm_ops"}
+        ),
+    )
 
-    numero_serie = Column(String(50), primary_key=True, index=True)
+    numero_serie = Column(String(50), primary_key=True)
     modele = Column(String(100), nullable=True)
     date_fabrication = Column(Date, nullable=True)
-    operateur = Column(String(50), nullable=False, index=True)
-    etat = Column(String(50), nullable=False, default="en_livraison", index=True)
-    affectation = Column(String(100), nullable=True, index=True)
+    operateur = Column(String(50), nullable=False)
+    etat = Column(String(50), nullable=False, default="en_livraison")
+    affectation = Column(String(100), nullable=True)
     hs = Column(Boolean, default=False)
     date_affectation = Column(DateTime, nullable=True)
     date_pose = Column(DateTime, nullable=True)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from datetime import datetime
+
+from app.core.database import Base
+
+
+class ConcentrateurCounter(Base):
+    """
+    Compteurs matérialisés des concentrateurs par (affectation, operateur, etat, hs).
+    Maintenus dans la même transaction que les écritures sur concentrateur.
+    """
+    __tablename__ = "concentrateur_counters"
+
+    # Chaîne vide = pas d'affectation (une clé primaire ne peut pas être NULL)
+    affectation = Column(String(100), primary_key=True, default="")
+    operateur = Column(String(50), primary_key=True)
+    etat = Column(String(50), primary_key=True)
+    hs = Column(Boolean, primary_key=True, default=False)
+    total = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
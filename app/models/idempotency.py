@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, DateTime
+
+from app.core.database import Base
+
+
+class ActionIdempotency(Base):
+    """
+    Clés d'idempotence des actions reçues par POST /actions/batch.
+    Table non partitionnée: l'unicité de la clé est globale (l'index unique
+    d'historique_action partitionnée doit inclure date_action).
+    Écrite dans la même transaction que l'action.
+    """
+    __tablename__ = "action_idempotency"
+
+    idempotency_key = Column(String(100), primary_key=True)
+    id_action = Column(Integer, nullable=False)
+    # Date de l'action: purge avec la rétention des partitions
+    date_action = Column(DateTime, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -16,6 +16,10 @@ class Rapport(Base):
     fichier = Column(String(500), nullable=True)
     date_generation = Column(DateTime, default=datetime.utcnow)
     format = Column(String(20), nullable=True)
+    # Génération en tâche de fond: en_attente, en_cours, termine ou erreur
+    statut = Column(String(20), nullable=False, default="termine")
+    lignes = Column(Integer, nullable=True)
+    erreur = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relations
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from datetime import datetime
+
+from app.core.database import Base
+
+
+class RefreshToken(Base):
+    """
+    Refresh tokens opaques, stockés sous forme d'empreinte SHA-256.
+    Chaque utilisation remplace le token (rotation): l'ancien est révoqué.
+    """
+    __tablename__ = "refresh_token"
+
+    id_refresh_token = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("utilisateur.id_utilisateur"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
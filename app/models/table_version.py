@@ -0,0 +1,16 @@
+from sqlalchemy import Column, BigInteger, String, DateTime
+from datetime import datetime
+
+from app.core.database import Base
+
+
+class TableVersion(Base):
+    """
+    Numéro de version par table, incrémenté dans la transaction de chaque
+    écriture de l'API. Sert à calculer les ETag des endpoints de lecture.
+    """
+    __tablename__ = "table_versions"
+
+    table_name = Column(String(100), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
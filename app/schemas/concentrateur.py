@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, date
 
@@ -62,17 +62,42 @@ class HistoriqueActionResponse(BaseModel):
 
 class ConcentrateurListResponse(BaseModel):
     data: List[ConcentrateurResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     limit: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    has_more: bool = False
+    next_cursor: Optional[str] = None
 
 
 class ConcentrateurDetailResponse(BaseModel):
     concentrateur: ConcentrateurResponse
     historique: List[HistoriqueActionResponse]
+    historique_has_more: bool = False
+    historique_next_cursor: Optional[str] = None
+
+
+class ConcentrateurScan(BaseModel):
+    numero_serie: str
+    etat: str
+    affectation: Optional[str] = None
+    poste_id: Optional[int] = None
 
 
 class ConcentrateurVerifyResponse(BaseModel):
     exists: bool
-    concentrateur: Optional[ConcentrateurResponse] = None
+    concentrateur: Optional[ConcentrateurScan] = None
+
+
+class ConcentrateurVerifyBatchRequest(BaseModel):
+    numeros_serie: List[str] = Field(..., min_length=1, max_length=1000)
+
+
+class ConcentrateurVerifyBatchItem(ConcentrateurVerifyResponse):
+    numero_serie: str
+
+
+class ConcentrateurVerifyBatchResponse(BaseModel):
+    total: int
+    trouves: int
+    resultats: List[ConcentrateurVerifyBatchItem]
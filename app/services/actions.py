@@ -0,0 +1,54 @@
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.api.pagination import PAGINATION_CURSOR, fetch_page
+from app.models.action import HistoriqueAction
+
+
+async def list_actions_with_users(
+    db: AsyncSession,
+    conditions: Optional[List] = None,
+    limit: int = 10,
+    before: Optional[str] = None
+) -> Tuple[List[HistoriqueAction], Optional[str]]:
+    """
+    Actions les plus récentes avec leur utilisateur chargé par JOIN,
+    en une seule requête quel que soit `limit`.
+    `before` est le curseur renvoyé par l'appel précédent (scroll infini).
+    Retourne (actions, next_cursor).
+    """
+    query = (
+        select(HistoriqueAction)
+        .options(joinedload(HistoriqueAction.utilisateur))
+        .where(*(conditions or []))
+    )
+    actions, _, next_cursor = await fetch_page(
+        db, query, HistoriqueAction.date_action, HistoriqueAction.id_action,
+        1, limit, PAGINATION_CURSOR, before
+    )
+    return actions, next_cursor
+
+
+def action_with_user(action: HistoriqueAction) -> dict:
+    """Sérialise une action avec un résumé de son utilisateur."""
+    user = action.utilisateur
+    return {
+        "id_action": action.id_action,
+        "type_action": action.type_action,
+        "date_action": action.date_action,
+        "ancien_etat": action.ancien_etat,
+        "nouvel_etat": action.nouvel_etat,
+        "ancienne_affectation": action.ancienne_affectation,
+        "nouvelle_affectation": action.nouvelle_affectation,
+        "commentaire": action.commentaire,
+        "concentrateur_id": action.concentrateur_id,
+        "user": {
+            "id": user.id_utilisateur,
+            "nom": user.nom,
+            "prenom": user.prenom,
+            "role": user.role
+        } if user else None
+    }
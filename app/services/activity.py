@@ -0,0 +1,136 @@
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, exists, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import upsert
+from app.models.action import HistoriqueAction
+from app.models.activity import ActionDailyCount
+from app.models.user import Utilisateur
+
+NO_BO = ""
+
+ActivityKey = Tuple[date, str, str, int]
+
+
+def activity_key(
+    date_action: datetime,
+    type_action: str,
+    base_affectee: Optional[str],
+    user_id: int
+) -> ActivityKey:
+    """Clé d'agrégat journalier normalisée (BO NULL -> chaîne vide)."""
+    return (date_action.date(), type_action, base_affectee or NO_BO, user_id)
+
+
+def day_range(jour: date, days: int = 1) -> tuple:
+    """Bornes [début, fin) en timestamps: comparables à l'index sur date_action."""
+    debut = datetime.combine(jour, time.min)
+    return debut, debut + timedelta(days=days)
+
+
+async def record_activity(
+    db: AsyncSession,
+    keys: Iterable[ActivityKey],
+    count: int = 1
+) -> None:
+    """
+    Ajoute des actions aux agrégats journaliers, dans la transaction courante
+    et en un seul INSERT ... ON CONFLICT.
+    `count` multiplie chaque clé (insertions en masse).
+    """
+    totals = Counter()
+    for key in keys:
+        totals[key] += count
+
+    rows = [
+        {
+            "jour": key[0],
+            "type_action": key[1],
+            "bo": key[2],
+            "user_id": key[3],
+            "total": total,
+            "updated_at": datetime.utcnow(),
+        }
+        for key, total in totals.items() if total
+    ]
+    if not rows:
+        return
+
+    stmt = upsert(db, ActionDailyCount).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["jour", "type_action", "bo", "user_id"],
+        set_={
+            "total": ActionDailyCount.total + stmt.excluded.total,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    await db.execute(stmt)
+
+
+async def rebuild_activity(db: AsyncSession, depuis: Optional[date] = None) -> int:
+    """
+    Recalcule les agrégats depuis historique_action (tous, ou à partir de
+    `depuis` inclus). La BO est celle actuelle de l'utilisateur.
+    Les insertions dans historique_action (et record_activity qui les
+    accompagne) sont bloquées jusqu'au commit: aucun incrément perdu ou
+    compté deux fois. Ne commit pas. Retourne le nombre de groupes écrits.
+    """
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(text("LOCK TABLE historique_action IN SHARE MODE"))
+    jour = func.date(HistoriqueAction.date_action)
+    bo = func.coalesce(Utilisateur.base_affectee, NO_BO)
+    source = (
+        select(jour, HistoriqueAction.type_action, bo, HistoriqueAction.user_id, func.count(), func.now())
+        .join(Utilisateur, Utilisateur.id_utilisateur == HistoriqueAction.user_id)
+        .group_by(jour, HistoriqueAction.type_action, bo, HistoriqueAction.user_id)
+    )
+
+    purge = delete(ActionDailyCount)
+    if depuis is not None:
+        purge = purge.where(ActionDailyCount.jour >= depuis)
+        source = source.where(HistoriqueAction.date_action >= day_range(depuis)[0])
+    await db.execute(purge)
+
+    result = await db.execute(
+        insert(ActionDailyCount).from_select(
+            ["jour", "type_action", "bo", "user_id", "total", "updated_at"],
+            source
+        )
+    )
+    return result.rowcount
+
+
+def actions_on_day(jour: date):
+    """
+    Nombre d'actions d'un jour (expression scalaire): lu dans les agrégats,
+    ou compté sur un intervalle semi-ouvert de date_action tant que les
+    agrégats n'ont pas été remplis (scripts.backfill_activity).
+    """
+    debut, fin = day_range(jour)
+    rollup = (
+        select(func.coalesce(func.sum(ActionDailyCount.total), 0))
+        .where(ActionDailyCount.jour == jour)
+        .scalar_subquery()
+    )
+    fallback = (
+        select(func.count()).select_from(HistoriqueAction)
+        .where(HistoriqueAction.date_action >= debut, HistoriqueAction.date_action < fin)
+        .scalar_subquery()
+    )
+    return case((exists(select(ActionDailyCount.jour)), rollup), else_=fallback)
+
+
+def activity_by_day_query(debut: date, fin: date, bo: Optional[str] = None):
+    """Actions par (jour, type_action) sur [debut, fin), filtrées par BO si fournie."""
+    conditions = [ActionDailyCount.jour >= debut, ActionDailyCount.jour < fin]
+    if bo is not None:
+        conditions.append(ActionDailyCount.bo == bo)
+    return (
+        select(ActionDailyCount.jour, ActionDailyCount.type_action, func.sum(ActionDailyCount.total))
+        .where(and_(*conditions))
+        .group_by(ActionDailyCount.jour, ActionDailyCount.type_action)
+        .order_by(ActionDailyCount.jour, ActionDailyCount.type_action)
+    )
@@ -0,0 +1,141 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import upsert
+from app.models.concentrateur import Concentrateur
+from app.models.counter import ConcentrateurCounter
+
+NO_AFFECTATION = ""
+
+CounterKey = Tuple[str, str, str, bool]
+
+
+def counter_key(
+    affectation: Optional[str],
+    operateur: str,
+    etat: str,
+    hs: Optional[bool]
+) -> CounterKey:
+    """Clé de compteur normalisée (affectation NULL -> chaîne vide)."""
+    return (affectation or NO_AFFECTATION, operateur, etat, bool(hs))
+
+
+def concentrateur_key(concentrateur: Concentrateur) -> CounterKey:
+    """Clé de compteur de l'état courant d'un concentrateur."""
+    return counter_key(
+        concentrateur.affectation,
+        concentrateur.operateur,
+        concentrateur.etat,
+        concentrateur.hs
+    )
+
+
+async def apply_counter_changes(
+    db: AsyncSession,
+    changes: Iterable[Tuple[Optional[CounterKey], Optional[CounterKey]]],
+    count: int = 1
+) -> None:
+    """
+    Applique des transitions (ancienne clé, nouvelle clé) aux compteurs,
+    dans la transaction courante et en un seul INSERT ... ON CONFLICT.
+    - (None, clé): création d'un concentrateur
+    - (clé, None): suppression
+    `count` multiplie chaque transition (insertions en masse).
+    """
+    deltas: Dict[CounterKey, int] = defaultdict(int)
+    for old_key, new_key in changes:
+        if old_key == new_key:
+            continue
+        if old_key is not None:
+            deltas[old_key] -= count
+        if new_key is not None:
+            deltas[new_key] += count
+
+    # Lignes dans un ordre fixe: deux transitions inverses concurrentes
+    # verrouillent les compteurs dans le même ordre (pas d'interblocage)
+    rows = [
+        {
+            "affectation": key[0],
+            "operateur": key[1],
+            "etat": key[2],
+            "hs": key[3],
+            "total": delta,
+            "updated_at": datetime.utcnow(),
+        }
+        for key, delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+
+    stmt = upsert(db, ConcentrateurCounter).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["affectation", "operateur", "etat", "hs"],
+        set_={
+            "total": ConcentrateurCounter.total + stmt.excluded.total,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    await db.execute(stmt)
+
+
+def _grouped_counts_query():
+    """Comptage réel par clé de compteur, directement sur concentrateur."""
+    group = (
+        func.coalesce(Concentrateur.affectation, NO_AFFECTATION),
+        Concentrateur.operateur,
+        Concentrateur.etat,
+        func.coalesce(Concentrateur.hs, False),
+    )
+    return select(*group, func.count()).group_by(*group)
+
+
+async def rebuild_counters(db: AsyncSession) -> int:
+    """
+    Recalcule tous les compteurs depuis la table concentrateur.
+    Les écritures sur concentrateur sont bloquées jusqu'au commit: aucune
+    nouvelle clé ne peut apparaître entre le DELETE et l'INSERT ... SELECT.
+    Retourne le nombre de groupes écrits.
+    """
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(text("LOCK TABLE concentrateur IN SHARE MODE"))
+    await db.execute(delete(ConcentrateurCounter))
+    source = _grouped_counts_query().add_columns(func.now())
+    result = await db.execute(
+        insert(ConcentrateurCounter).from_select(
+            ["affectation", "operateur", "etat", "hs", "total", "updated_at"],
+            source
+        )
+    )
+    return result.rowcount
+
+
+async def counters_drift(db: AsyncSession) -> Dict[CounterKey, Tuple[int, int]]:
+    """
+    Compare les compteurs stockés aux valeurs réelles.
+    Retourne {clé: (stocké, réel)} pour les groupes divergents.
+    """
+    result = await db.execute(_grouped_counts_query())
+    actual = {counter_key(*row[:4]): row[4] for row in result}
+
+    result = await db.execute(
+        select(
+            ConcentrateurCounter.affectation,
+            ConcentrateurCounter.operateur,
+            ConcentrateurCounter.etat,
+            ConcentrateurCounter.hs,
+            ConcentrateurCounter.total,
+        )
+    )
+    stored = {counter_key(*row[:4]): row[4] for row in result}
+
+    drift = {}
+    for key in set(actual) | set(stored):
+        expected = actual.get(key, 0)
+        current = stored.get(key, 0)
+        if expected != current:
+            drift[key] = (current, expected)
+    return drift
@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import AsyncIterator, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+
+MEDIA_TYPES = {
+    FORMAT_CSV: "text/csv; charset=utf-8",
+    FORMAT_NDJSON: "application/x-ndjson",
+}
+
+# Lignes lues par aller-retour du curseur serveur (et par morceau envoyé)
+EXPORT_BATCH_SIZE = 1000
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+def format_rows(rows, columns, fmt: str, header: bool = False) -> str:
+    """Met en forme un lot de lignes (tuples dans l'ordre de `columns`)."""
+    if fmt == FORMAT_NDJSON:
+        return "".join(
+            json.dumps(dict(zip(columns, row)), default=_json_default, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def stream_partitions(
+    query,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    db: Optional[AsyncSession] = None
+) -> AsyncIterator[list]:
+    """
+    Exécute `query` (select de colonnes) avec un curseur côté serveur et
+    produit les lignes par lots de `batch_size`: mémoire constante quel que
+    soit le nombre de lignes.
+    Sans `db`, ouvre sa propre session: la session de la requête HTTP est
+    fermée avant l'envoi d'une StreamingResponse.
+    """
+    if db is None:
+        async with AsyncSessionLocal() as session:
+            async for partition in stream_partitions(query, batch_size, session):
+                yield partition
+        return
+
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for partition in result.partitions():
+        yield partition
+
+
+async def stream_query(
+    query,
+    fmt: str,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    db: Optional[AsyncSession] = None
+) -> AsyncIterator[str]:
+    """Résultat de `query` en CSV ou NDJSON, lot par lot (voir stream_partitions)."""
+    columns = [column.key for column in query.selected_columns]
+    if fmt == FORMAT_CSV:
+        yield format_rows([], columns, fmt, header=True)
+    async for partition in stream_partitions(query, batch_size, db):
+        yield format_rows(partition, columns, fmt)
@@ -0,0 +1,99 @@
+import re
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+# Partitions mensuelles créées par la migration 007: historique_action_AAAA_MM
+PARTITION_PATTERN = re.compile(r"^historique_action_(\d{4})_(\d{2})$")
+ARCHIVE_SCHEMA = "archive"
+
+
+def add_months(mois: date, months: int) -> date:
+    """Premier jour du mois situé `months` mois après (ou avant) `mois`."""
+    index = mois.year * 12 + mois.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def is_partitioned(db: AsyncSession) -> bool:
+    """Le partitionnement n'existe que sous Postgres (migration 007)."""
+    return db.bind.dialect.name == "postgresql"
+
+
+async def ensure_partitions(db: AsyncSession, months_ahead: Optional[int] = None) -> List[str]:
+    """
+    Crée les partitions du mois courant et des `months_ahead` mois suivants
+    (idempotent). Ne commit pas. Sans effet hors Postgres.
+    Retourne les noms des partitions garanties.
+    """
+    if not is_partitioned(db):
+        return []
+    if months_ahead is None:
+        months_ahead = settings.HISTORIQUE_PARTITIONS_AHEAD
+    current = datetime.utcnow().date().replace(day=1)
+    noms = []
+    for offset in range(months_ahead + 1):
+        result = await db.execute(
+            text("SELECT create_historique_action_partition(:mois)"),
+            {"mois": add_months(current, offset)}
+        )
+        noms.append(result.scalar())
+    return noms
+
+
+async def list_partitions(db: AsyncSession) -> List[Tuple[str, date]]:
+    """Partitions mensuelles attachées, triées par mois: [(nom, premier jour)]."""
+    if not is_partitioned(db):
+        return []
+    result = await db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'historique_action'::regclass"
+    ))
+    partitions = []
+    for (nom,) in result:
+        match = PARTITION_PATTERN.match(nom)
+        if match:
+            partitions.append((nom, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+async def detach_old_partitions(
+    db: AsyncSession,
+    retention_months: Optional[int] = None,
+    drop: bool = False,
+    dry_run: bool = False
+) -> List[str]:
+    """
+    Détache les partitions entièrement antérieures à la fenêtre de rétention
+    (mois courant inclus), puis les déplace dans le schéma archive ou les
+    supprime (`drop`). Ne commit pas. Sans effet hors Postgres.
+    Retourne les noms des partitions concernées.
+    """
+    if retention_months is None:
+        retention_months = settings.HISTORIQUE_RETENTION_MONTHS
+    if retention_months <= 0:
+        return []
+    limite = add_months(datetime.utcnow().date().replace(day=1), -(retention_months - 1))
+    anciennes = [nom for nom, mois in await list_partitions(db) if mois < limite]
+    if dry_run or not anciennes:
+        return anciennes
+
+    # Clés d'idempotence des actions sorties de la rétention
+    await db.execute(
+        text("DELETE FROM action_idempotency WHERE date_action < :limite"),
+        {"limite": limite}
+    )
+
+    if not drop:
+        await db.execute(text(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}"))
+    for nom in anciennes:
+        await db.execute(text(f"ALTER TABLE historique_action DETACH PARTITION {nom}"))
+        if drop:
+            await db.execute(text(f"DROP TABLE {nom}"))
+        else:
+            await db.execute(text(f"ALTER TABLE {nom} SET SCHEMA {ARCHIVE_SCHEMA}"))
+    return anciennes
@@ -0,0 +1,133 @@
+import random
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import upsert
+from app.models.action import HistoriqueAction
+from app.models.carton import Carton
+from app.models.concentrateur import Concentrateur
+from app.services.activity import activity_key, record_activity
+from app.services.counters import apply_counter_changes, counter_key
+from app.services.versions import bump_versions, CARTON, CONCENTRATEUR, HISTORIQUE_ACTION
+
+# Suffixe de numéro de série: 6 caractères hexadécimaux
+SERIAL_SPACE = 16 ** 6
+
+
+async def generer_numeros_serie(db: AsyncSession, operateur: str, quantite: int) -> List[str]:
+    """
+    Génère `quantite` numéros de série distincts CPL-XXX-AAAAMMJJ-XXXXXX,
+    en écartant ceux déjà présents en base (une requête par tirage).
+    """
+    prefix = f"CPL-{operateur[:3].upper()}-{datetime.now().strftime('%Y%m%d')}-"
+    serials: List[str] = []
+    reserved = set()
+    while len(serials) < quantite:
+        candidates = [
+            f"{prefix}{n:06X}"
+            for n in random.sample(range(SERIAL_SPACE), quantite - len(serials))
+        ]
+        candidates = [s for s in candidates if s not in reserved]
+        result = await db.execute(
+            select(Concentrateur.numero_serie).where(Concentrateur.numero_serie.in_(candidates))
+        )
+        taken = set(result.scalars())
+        for serial in candidates:
+            if serial not in taken:
+                serials.append(serial)
+                reserved.add(serial)
+    return serials
+
+
+async def receptionner_carton(
+    db: AsyncSession,
+    numero_carton: str,
+    operateur: str,
+    quantite: int,
+    user_id: int,
+    base_affectee: Optional[str] = None
+) -> List[str]:
+    """
+    Réception en masse d'un carton (ou d'une palette):
+    upsert du carton, puis insertion des concentrateurs et de leur
+    historique en un INSERT multi-lignes chacun. Ne commit pas.
+    Retourne les numéros de série créés.
+    """
+    now = datetime.utcnow()
+    serials = await generer_numeros_serie(db, operateur, quantite)
+
+    # Carton: créé ou complété si déjà reçu partiellement
+    stmt = upsert(db, Carton).values(
+        numero_carton=numero_carton,
+        operateur=operateur,
+        date_reception=now,
+        nombre_concentrateurs=quantite,
+        statut="receptionne",
+        created_at=now,
+        updated_at=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["numero_carton"],
+        set_={
+            "nombre_concentrateurs": func.coalesce(Carton.nombre_concentrateurs, 0) + stmt.excluded.nombre_concentrateurs,
+            "date_reception": stmt.excluded.date_reception,
+            "statut": stmt.excluded.statut,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    await db.execute(stmt)
+
+    await db.execute(
+        insert(Concentrateur),
+        [
+            {
+                "numero_serie": serial,
+                "operateur": operateur,
+                "etat": "en_stock",
+                "affectation": "Magasin",
+                "hs": False,
+                "numero_carton": numero_carton,
+                "date_affectation": now,
+                "date_dernier_etat": now,
+                "date_creation": now,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for serial in serials
+        ]
+    )
+
+    await db.execute(
+        insert(HistoriqueAction),
+        [
+            {
+                "type_action": "reception_magasin",
+                "date_action": now,
+                "ancien_etat": "en_livraison",
+                "nouvel_etat": "en_stock",
+                "ancienne_affectation": None,
+                "nouvelle_affectation": "Magasin",
+                "commentaire": f"Réception carton {numero_carton}",
+                "scan_qr": False,
+                "user_id": user_id,
+                "concentrateur_id": serial,
+                "carton_id": numero_carton,
+                "created_at": now,
+            }
+            for serial in serials
+        ]
+    )
+
+    await apply_counter_changes(
+        db,
+        [(None, counter_key("Magasin", operateur, "en_stock", False))],
+        count=len(serials)
+    )
+    await record_activity(
+        db, [activity_key(now, "reception_magasin", base_affectee, user_id)], count=len(serials)
+    )
+    await bump_versions(db, CARTON, CONCENTRATEUR, HISTORIQUE_ACTION)
+    return serials
@@ -0,0 +1,63 @@
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.refresh_token import RefreshToken
+
+
+def hash_refresh_token(token: str) -> str:
+    """Empreinte stockée en base (le token lui-même n'est jamais conservé)."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def issue_refresh_token(db: AsyncSession, user_id: int) -> str:
+    """
+    Crée un refresh token pour l'utilisateur et retourne sa valeur en clair.
+    Ne commit pas.
+    """
+    token = secrets.token_urlsafe(32)
+    db.add(RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(token),
+        expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    await db.flush()
+    return token
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> Optional[tuple]:
+    """
+    Consomme un refresh token valide et en émet un nouveau (session glissante).
+    Retourne (user_id, nouveau_token), ou None si le token est inconnu,
+    révoqué ou expiré. Ne commit pas.
+    """
+    now = datetime.utcnow()
+    result = await db.execute(
+        select(RefreshToken)
+        .where(RefreshToken.token_hash == hash_refresh_token(token))
+        .with_for_update()
+    )
+    current = result.scalar_one_or_none()
+    if current is None or current.revoked_at is not None or current.expires_at <= now:
+        return None
+
+    current.revoked_at = now
+    return current.user_id, await issue_refresh_token(db, current.user_id)
+
+
+async def revoke_user_refresh_tokens(db: AsyncSession, user_id: int) -> int:
+    """
+    Révoque tous les refresh tokens actifs d'un utilisateur.
+    Retourne le nombre de tokens révoqués. Ne commit pas.
+    """
+    result = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+    return result.rowcount
@@ -0,0 +1,199 @@
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.action import HistoriqueAction
+from app.models.rapport import Rapport
+from app.services.export import FORMAT_CSV, format_rows, stream_partitions
+
+FORMAT_PARQUET = "parquet"
+REPORT_FORMATS = (FORMAT_CSV, FORMAT_PARQUET)
+
+TYPE_HISTORIQUE_ACTIONS = "historique_actions"
+
+# Lignes par lot lu (et par row group Parquet)
+REPORT_BATCH_SIZE = 10000
+
+STATUT_EN_ATTENTE = "en_attente"
+STATUT_EN_COURS = "en_cours"
+STATUT_TERMINE = "termine"
+STATUT_ERREUR = "erreur"
+
+ACTION_REPORT_COLUMNS = (
+    HistoriqueAction.id_action,
+    HistoriqueAction.date_action,
+    HistoriqueAction.type_action,
+    HistoriqueAction.concentrateur_id,
+    HistoriqueAction.ancien_etat,
+    HistoriqueAction.nouvel_etat,
+    HistoriqueAction.ancienne_affectation,
+    HistoriqueAction.nouvelle_affectation,
+    HistoriqueAction.user_id,
+    HistoriqueAction.poste_id,
+    HistoriqueAction.carton_id,
+    HistoriqueAction.scan_qr,
+    HistoriqueAction.commentaire,
+)
+
+
+def parquet_available() -> bool:
+    """Le format Parquet nécessite le paquet optionnel pyarrow."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def actions_report_query(periode_debut: datetime, periode_fin: datetime):
+    """
+    Actions de la période [debut, fin[ dans l'ordre (date_action, id_action):
+    parcours de l'index ix_historique_action_date_id.
+    """
+    return (
+        select(*ACTION_REPORT_COLUMNS)
+        .where(
+            HistoriqueAction.date_action >= periode_debut,
+            HistoriqueAction.date_action < periode_fin
+        )
+        .order_by(HistoriqueAction.date_action, HistoriqueAction.id_action)
+    )
+
+
+async def create_rapport(
+    db: AsyncSession,
+    user_id: int,
+    periode_debut: datetime,
+    periode_fin: datetime,
+    fmt: str
+) -> Rapport:
+    """Enregistre un rapport à générer (statut en_attente). Commit."""
+    rapport = Rapport(
+        user_id=user_id,
+        type_rapport=TYPE_HISTORIQUE_ACTIONS,
+        periode_debut=periode_debut,
+        periode_fin=periode_fin,
+        format=fmt,
+        statut=STATUT_EN_ATTENTE
+    )
+    db.add(rapport)
+    await db.commit()
+    await db.refresh(rapport)
+    return rapport
+
+
+def job_status(rapport: Rapport) -> dict:
+    """Suivi d'une génération, lu en base: visible de tous les workers."""
+    return {
+        "job_id": rapport.id_rapport,
+        "statut": rapport.statut,
+        "type_rapport": rapport.type_rapport,
+        "periode_debut": rapport.periode_debut,
+        "periode_fin": rapport.periode_fin,
+        "format": rapport.format,
+        "id_rapport": rapport.id_rapport if rapport.statut == STATUT_TERMINE else None,
+        "lignes": rapport.lignes,
+        "detail": rapport.erreur,
+    }
+
+
+async def _update_rapport(id_rapport: int, **fields) -> None:
+    """Transition de statut, commitée aussitôt (session dédiée)."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Rapport).where(Rapport.id_rapport == id_rapport).values(**fields))
+        await db.commit()
+
+
+def _write_rows(path: Path, rows, columns, mode: str = "a", header: bool = False) -> None:
+    with open(path, mode, newline="", encoding="utf-8") as fichier:
+        fichier.write(format_rows(rows, columns, FORMAT_CSV, header=header))
+
+
+async def _write_csv(path: Path, query) -> int:
+    columns = [column.key for column in query.selected_columns]
+    lignes = 0
+    await asyncio.to_thread(_write_rows, path, [], columns, "w", True)
+    async for partition in stream_partitions(query, REPORT_BATCH_SIZE):
+        # Mise en forme et écriture d'un lot: hors de la boucle d'événements
+        await asyncio.to_thread(_write_rows, path, partition, columns)
+        lignes += len(partition)
+    return lignes
+
+
+def _parquet_schema(query):
+    import pyarrow as pa
+
+    types = {int: pa.int64(), bool: pa.bool_(), datetime: pa.timestamp("us"), str: pa.string()}
+    return pa.schema([
+        (column.key, types.get(column.type.python_type, pa.string()))
+        for column in query.selected_columns
+    ])
+
+
+def _write_row_group(writer, schema, rows) -> None:
+    import pyarrow as pa
+
+    columns = list(zip(*rows))
+    table = pa.Table.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+        schema=schema
+    )
+    writer.write_table(table)
+
+
+async def _write_parquet(path: Path, query) -> int:
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(query)
+    lignes = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        async for partition in stream_partitions(query, REPORT_BATCH_SIZE):
+            # Conversion et compression d'un row group: hors de la boucle d'événements
+            await asyncio.to_thread(_write_row_group, writer, schema, partition)
+            lignes += len(partition)
+    return lignes
+
+
+async def generate_actions_report(id_rapport: int) -> Rapport:
+    """
+    Génère le rapport enregistré par create_rapport: écrit l'historique des
+    actions de la période dans RAPPORTS_DIR (CSV ou Parquet, lecture par
+    curseur côté serveur, mémoire constante). Chaque transition de statut
+    est enregistrée sur le Rapport.
+    """
+    async with AsyncSessionLocal() as db:
+        rapport = await db.get(Rapport, id_rapport)
+    await _update_rapport(id_rapport, statut=STATUT_EN_COURS)
+
+    dossier = Path(settings.RAPPORTS_DIR)
+    dossier.mkdir(parents=True, exist_ok=True)
+    path = dossier / (
+        f"{TYPE_HISTORIQUE_ACTIONS}_{rapport.periode_debut:%Y%m%d}_{rapport.periode_fin:%Y%m%d}"
+        f"_{id_rapport}.{rapport.format}"
+    )
+
+    query = actions_report_query(rapport.periode_debut, rapport.periode_fin)
+    try:
+        if rapport.format == FORMAT_PARQUET:
+            lignes = await _write_parquet(path, query)
+        else:
+            lignes = await _write_csv(path, query)
+    except Exception as exc:
+        path.unlink(missing_ok=True)
+        await _update_rapport(id_rapport, statut=STATUT_ERREUR, erreur=str(exc))
+        raise
+
+    await _update_rapport(
+        id_rapport,
+        statut=STATUT_TERMINE,
+        fichier=str(path),
+        lignes=lignes,
+        date_generation=datetime.utcnow()
+    )
+    async with AsyncSessionLocal() as db:
+        return await db.get(Rapport, id_rapport)
@@ -0,0 +1,61 @@
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.concentrateur import Concentrateur
+
+# Projection compacte renvoyée au scan QR
+SCAN_COLUMNS = (
+    Concentrateur.numero_serie,
+    Concentrateur.etat,
+    Concentrateur.affectation,
+    Concentrateur.poste_id,
+)
+
+# numero_serie -> projection, ou None si le concentrateur n'existe pas
+_scan_cache = TTLCache(ttl=settings.SCAN_CACHE_TTL_SECONDS, maxsize=settings.SCAN_CACHE_MAXSIZE)
+
+_MISS = object()
+
+
+def invalidate_scans(numeros_serie: Iterable[str]) -> None:
+    """
+    Retire des numéros de série du cache de scan.
+    À appeler après le commit de toute écriture sur concentrateur
+    (création comprise: un numéro inconnu est aussi mis en cache).
+    """
+    for numero_serie in numeros_serie:
+        _scan_cache.delete(numero_serie)
+
+
+def scan_query(numeros_serie: List[str]):
+    """Projection de scan des numéros de série donnés."""
+    return select(*SCAN_COLUMNS).where(Concentrateur.numero_serie.in_(numeros_serie))
+
+
+async def lookup_scans(db: AsyncSession, numeros_serie: List[str]) -> Dict[str, Optional[dict]]:
+    """
+    Projection de scan de chaque numéro de série (None si inconnu).
+    Les numéros absents du cache sont lus en une seule requête.
+    """
+    found: Dict[str, Optional[dict]] = {}
+    missing = []
+    for numero_serie in numeros_serie:
+        cached = _scan_cache.get(numero_serie, _MISS)
+        if cached is _MISS:
+            missing.append(numero_serie)
+        else:
+            found[numero_serie] = cached
+
+    if missing:
+        result = await db.execute(scan_query(missing))
+        rows = {row.numero_serie: dict(row._mapping) for row in result}
+        for numero_serie in missing:
+            scan = rows.get(numero_serie)
+            _scan_cache.set(numero_serie, scan)
+            found[numero_serie] = scan
+
+    return found
@@ -0,0 +1,134 @@
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.concentrateur import Concentrateur
+from app.services.versions import CONCENTRATEUR, get_versions
+
+# Colonnes couvertes par le paramètre `search` de GET /concentrateurs
+SEARCH_COLUMNS = (
+    Concentrateur.numero_serie,
+    Concentrateur.numero_carton,
+    Concentrateur.operateur,
+)
+
+# Au-delà, l'index de repli ne réduit plus assez le balayage pour valoir un IN (...)
+FALLBACK_MAX_CANDIDATES = 5000
+
+
+def escape_like(term: str) -> str:
+    """Neutralise les jokers LIKE saisis par l'utilisateur (échappement par \\)."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def is_serial_prefix(term: str) -> bool:
+    """
+    Le terme ressemble-t-il à un début de numéro de série (ex: CPL-ITR-) ?
+    Tous les numéros de série commencent par un préfixe de SEARCH_SERIAL_PREFIXES,
+    une recherche "contient" équivaut donc à une recherche par préfixe.
+    """
+    term = term.upper()
+    return any(term.startswith(prefix) for prefix in settings.SEARCH_SERIAL_PREFIXES)
+
+
+def serial_prefix_condition(term: str):
+    """
+    Préfixe de numéro de série: LIKE 'terme%' sur numero_serie (clé primaire
+    en collation C, index GIN pg_trgm sinon),
+    "contient" inchangé sur le carton et l'opérateur (index GIN pg_trgm).
+    """
+    prefix = f"{escape_like(term.upper())}%"
+    pattern = f"%{escape_like(term)}%"
+    return or_(
+        Concentrateur.numero_serie.like(prefix, escape="\\"),
+        Concentrateur.numero_carton.ilike(pattern, escape="\\"),
+        Concentrateur.operateur.ilike(pattern, escape="\\"),
+    )
+
+
+def contains_condition(term: str):
+    """
+    Recherche "contient" insensible à la casse sur les trois colonnes.
+    Sous Postgres, servie par les index GIN pg_trgm (terme d'au moins 3 caractères).
+    """
+    pattern = f"%{escape_like(term)}%"
+    return or_(*(column.ilike(pattern, escape="\\") for column in SEARCH_COLUMNS))
+
+
+def trigrams(text: str) -> Set[str]:
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Index trigrammes en mémoire des colonnes de recherche, pour les bases
+    sans pg_trgm (SQLite des tests). Reconstruit quand la version de la
+    table concentrateur change (toute écriture de l'API, voir bump_versions).
+    """
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self._postings: Dict[str, Set[str]] = {}
+
+    def build(self, rows) -> None:
+        postings: Dict[str, Set[str]] = defaultdict(set)
+        for numero_serie, *texts in rows:
+            for text in (numero_serie, *texts):
+                if text:
+                    for trigram in trigrams(text):
+                        postings[trigram].add(numero_serie)
+        self._postings = dict(postings)
+
+    def candidates(self, term: str) -> Optional[Set[str]]:
+        """
+        Sur-ensemble des numéros de série dont une colonne contient `term`,
+        ou None si le terme est trop court pour être filtré.
+        """
+        keys = trigrams(term)
+        if not keys:
+            return None
+        postings = sorted((self._postings.get(key, set()) for key in keys), key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
+
+
+_fallback_index = TrigramIndex()
+
+
+async def _fallback_candidates(db: AsyncSession, term: str) -> Optional[Set[str]]:
+    version = (await get_versions(db, [CONCENTRATEUR]))[CONCENTRATEUR]
+    if version != _fallback_index.version:
+        result = await db.execute(select(*SEARCH_COLUMNS))
+        _fallback_index.build(result.all())
+        _fallback_index.version = version
+    return _fallback_index.candidates(term)
+
+
+async def search_condition(db: AsyncSession, term: str):
+    """
+    Condition SQL du paramètre `search`:
+    - préfixe de numéro de série: LIKE 'terme%' sur le numéro de série,
+      ILIKE '%terme%' sur le carton et l'opérateur
+    - Postgres: ILIKE '%terme%' (index GIN pg_trgm)
+    - autres bases: ILIKE restreint aux candidats de l'index en mémoire
+    """
+    term = term.strip()
+    if is_serial_prefix(term):
+        return serial_prefix_condition(term)
+
+    condition = contains_condition(term)
+    if db.bind.dialect.name == "postgresql":
+        return condition
+
+    candidates = await _fallback_candidates(db, term)
+    if candidates is None or len(candidates) > FALLBACK_MAX_CANDIDATES:
+        return condition
+    return and_(Concentrateur.numero_serie.in_(sorted(candidates)), condition)
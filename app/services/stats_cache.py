@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import build_cache_backend
+from app.core.config import settings
+from app.core.singleflight import get_flight
+from app.services.versions import get_versions
+
+_backend = None
+_flight = get_flight("stats-cache")
+
+
+def get_stats_cache():
+    """Backend du cache des statistiques (RESULT_CACHE_BACKEND), créé au premier appel."""
+    global _backend
+    if _backend is None:
+        _backend = build_cache_backend(
+            settings.RESULT_CACHE_BACKEND,
+            ttl=settings.STATS_CACHE_TTL_SECONDS,
+            maxsize=settings.STATS_CACHE_MAXSIZE,
+            namespace="stats"
+        )
+    return _backend
+
+
+async def cached_stats(
+    db: AsyncSession,
+    endpoint: str,
+    tables: Sequence[str],
+    compute: Callable[[], Awaitable[Any]],
+    scope: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None
+) -> Any:
+    """
+    Résultat de `compute` mis en cache par endpoint, BO (`scope`) et paramètres.
+    La clé contient la version des `tables` lues: toute écriture de l'API sur
+    l'une d'elles (bump_versions) rend l'entrée obsolète, y compris dans un
+    cache partagé entre processus.
+    Les requêtes concurrentes de même clé partagent un seul calcul.
+    La valeur retournée est partagée: ne pas la modifier.
+    """
+    versions = await get_versions(db, tables)
+    key = "|".join([
+        endpoint,
+        scope or "",
+        "&".join(f"{name}={value}" for name, value in sorted((params or {}).items())),
+        datetime.utcnow().date().isoformat(),
+        ",".join(f"{table}:{version}" for table, version in sorted(versions.items())),
+    ])
+
+    cache = get_stats_cache()
+    value = await cache.get(key)
+    if value is not None:
+        return value
+
+    async def load():
+        value = await compute()
+        await cache.set(key, value)
+        return value
+
+    return await _flight.do(key, load)
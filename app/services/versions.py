@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import Dict, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import upsert
+from app.models.table_version import TableVersion
+
+# Tables suivies (noms des tables SQL)
+CONCENTRATEUR = "concentrateur"
+HISTORIQUE_ACTION = "historique_action"
+POSTE_ELECTRIQUE = "poste_electrique"
+CARTON = "carton"
+UTILISATEUR = "utilisateur"
+
+
+async def bump_versions(db: AsyncSession, *tables: str) -> None:
+    """
+    Incrémente la version des tables écrites, dans la transaction courante
+    (en un seul INSERT ... ON CONFLICT). À appeler juste avant le commit:
+    le verrou de ligne est alors tenu le moins longtemps possible.
+    """
+    now = datetime.utcnow()
+    stmt = upsert(db, TableVersion).values([
+        {"table_name": table, "version": 1, "updated_at": now}
+        for table in sorted(set(tables))
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["table_name"],
+        set_={
+            "version": TableVersion.version + 1,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+    await db.execute(stmt)
+
+
+async def get_versions(db: AsyncSession, tables: Iterable[str]) -> Dict[str, int]:
+    """Version courante de chaque table (0 si jamais écrite)."""
+    tables = list(tables)
+    result = await db.execute(
+        select(TableVersion.table_name, TableVersion.version)
+        .where(TableVersion.table_name.in_(tables))
+    )
+    versions = dict(result.all())
+    return {table: versions.get(table, 0) for table in tables}
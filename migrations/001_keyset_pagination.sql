@@ -0,0 +1,12 @@
+-- Index composites pour la pagination par curseur
+-- GET /concentrateurs : ORDER BY date_dernier_etat DESC, numero_serie DESC
+-- GET /actions, /actions/me : ORDER BY date_action DESC, id_action DESC
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_concentrateur_dernier_etat_serie
+    ON concentrateur (date_dernier_etat, numero_serie);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_historique_action_date_id
+    ON historique_action (date_action, id_action);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_historique_action_user_date_id
+    ON historique_action (user_id, date_action, id_action);
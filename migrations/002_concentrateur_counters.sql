@@ -0,0 +1,19 @@
+-- Compteurs matérialisés des concentrateurs par (affectation, operateur, etat, hs)
+-- Maintenus par l'API dans la transaction de chaque écriture;
+-- python -m scripts.rebuild_counters répare une éventuelle dérive.
+
+CREATE TABLE IF NOT EXISTS concentrateur_counters (
+    affectation VARCHAR(100) NOT NULL DEFAULT '',
+    operateur VARCHAR(50) NOT NULL,
+    etat VARCHAR(50) NOT NULL,
+    hs BOOLEAN NOT NULL DEFAULT false,
+    total INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT now(),
+    PRIMARY KEY (affectation, operateur, etat, hs)
+);
+
+INSERT INTO concentrateur_counters (affectation, operateur, etat, hs, total, updated_at)
+SELECT COALESCE(affectation, ''), operateur, etat, COALESCE(hs, false), COUNT(*), now()
+FROM concentrateur
+GROUP BY COALESCE(affectation, ''), operateur, etat, COALESCE(hs, false)
+ON CONFLICT (affectation, operateur, etat, hs) DO UPDATE SET total = EXCLUDED.total, updated_at = now();
@@ -0,0 +1,7 @@
+-- Clé d'idempotence client pour POST /actions/batch (synchronisation hors ligne)
+
+ALTER TABLE historique_action ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(100);
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_historique_action_idempotency_key
+    ON historique_action (idempotency_key)
+    WHERE idempotency_key IS NOT NULL;
@@ -0,0 +1,12 @@
+-- Refresh tokens (rotation à chaque POST /auth/refresh, révocation par utilisateur)
+
+CREATE TABLE IF NOT EXISTS refresh_token (
+    id_refresh_token SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES utilisateur (id_utilisateur),
+    token_hash VARCHAR(64) NOT NULL UNIQUE,
+    expires_at TIMESTAMP NOT NULL,
+    revoked_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_refresh_token_user_id ON refresh_token (user_id);
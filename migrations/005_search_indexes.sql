@@ -0,0 +1,22 @@
+-- Recherche de GET /concentrateurs (paramètre search)
+-- Préfixe de numéro de série: B-tree varchar_pattern_ops (LIKE 'CPL-ITR-%', quelle que soit la collation)
+-- Recherche "contient": GIN pg_trgm (ILIKE '%terme%', terme d'au moins 3 caractères)
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_concentrateur_numero_serie_pattern
+    ON concentrateur (numero_serie varchar_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_concentrateur_numero_carton_pattern
+    ON concentrateur (numero_carton varchar_pattern_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_concentrateur_numero_serie_trgm
+    ON concentrateur USING gin (numero_serie gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_concentrateur_numero_carton_trgm
+    ON concentrateur USING gin (numero_carton gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_concentrateur_operateur_trgm
+    ON concentrateur USING gin (operateur gin_trgm_ops);
+
+ANALYZE concentrateur;
@@ -0,0 +1,14 @@
+-- Versions par table pour les ETag des endpoints de lecture (GET conditionnel)
+-- Incrémentées par l'API dans la transaction de chaque écriture.
+-- Une écriture hors API doit aussi incrémenter la version, par exemple:
+--   UPDATE table_versions SET version = version + 1 WHERE table_name = 'concentrateur';
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT now()
+);
+
+INSERT INTO table_versions (table_name, version)
+VALUES ('concentrateur', 0), ('historique_action', 0), ('poste_electrique', 0), ('carton', 0)
+ON CONFLICT (table_name) DO NOTHING;
@@ -0,0 +1,78 @@
+-- Partitionnement mensuel de historique_action sur date_action
+-- Les requêtes filtrées par période (actions du jour, rapports) ne lisent
+-- que les partitions concernées; les index restent de la taille d'un mois.
+--
+-- La conversion recopie la table dans une seule transaction (verrou exclusif):
+-- à appliquer pendant une fenêtre de maintenance.
+-- Partitions suivantes et rétention: python -m scripts.partitions
+
+-- Crée (si besoin) la partition du mois contenant `mois`, retourne son nom
+CREATE OR REPLACE FUNCTION create_historique_action_partition(mois DATE) RETURNS TEXT AS $$
+DECLARE
+    debut DATE := date_trunc('month', mois)::date;
+    nom TEXT := format('historique_action_%s', to_char(debut, 'YYYY_MM'));
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF historique_action FOR VALUES FROM (%L) TO (%L)',
+        nom, debut, (debut + interval '1 month')::date
+    );
+    RETURN nom;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    sequence_name TEXT := pg_get_serial_sequence('historique_action', 'id_action');
+    mois DATE;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'historique_action'::regclass
+    ) THEN
+        RETURN;
+    END IF;
+
+    -- La clé de partitionnement ne peut pas être NULL
+    UPDATE historique_action SET date_action = COALESCE(created_at, now()) WHERE date_action IS NULL;
+
+    EXECUTE format('ALTER SEQUENCE %s OWNED BY NONE', sequence_name);
+    ALTER TABLE historique_action RENAME TO historique_action_legacy;
+
+    CREATE TABLE historique_action (
+        LIKE historique_action_legacy INCLUDING DEFAULTS
+    ) PARTITION BY RANGE (date_action);
+
+    ALTER TABLE historique_action ALTER COLUMN date_action SET NOT NULL;
+    ALTER TABLE historique_action ADD PRIMARY KEY (id_action, date_action);
+    ALTER TABLE historique_action
+        ADD FOREIGN KEY (user_id) REFERENCES utilisateur (id_utilisateur),
+        ADD FOREIGN KEY (concentrateur_id) REFERENCES concentrateur (numero_serie),
+        ADD FOREIGN KEY (carton_id) REFERENCES carton (numero_carton),
+        ADD FOREIGN KEY (poste_id) REFERENCES poste_electrique (id_poste);
+
+    -- Une partition par mois de l'historique existant, et 3 mois d'avance
+    mois := date_trunc('month', COALESCE((SELECT min(date_action) FROM historique_action_legacy), now()))::date;
+    WHILE mois <= (date_trunc('month', now()) + interval '3 months')::date LOOP
+        PERFORM create_historique_action_partition(mois);
+        mois := (mois + interval '1 month')::date;
+    END LOOP;
+    -- Filet de sécurité si une partition manque (scripts.partitions la crée à l'avance)
+    CREATE TABLE historique_action_default PARTITION OF historique_action DEFAULT;
+
+    INSERT INTO historique_action SELECT * FROM historique_action_legacy;
+    DROP TABLE historique_action_legacy;
+    EXECUTE format('ALTER SEQUENCE %s OWNED BY historique_action.id_action', sequence_name);
+
+    -- Index (propagés à chaque partition); id_action, date_action et user_id
+    -- seuls sont couverts par la clé primaire et les index composites
+    CREATE INDEX ix_historique_action_date_id ON historique_action (date_action, id_action);
+    CREATE INDEX ix_historique_action_user_date_id ON historique_action (user_id, date_action, id_action);
+    CREATE INDEX ix_historique_action_type_action ON historique_action (type_action);
+    CREATE INDEX ix_historique_action_concentrateur_id ON historique_action (concentrateur_id);
+    -- Unicité par partition: la clé de partitionnement doit faire partie de l'index
+    CREATE UNIQUE INDEX ux_historique_action_idempotency_key
+        ON historique_action (idempotency_key, date_action)
+        WHERE idempotency_key IS NOT NULL;
+END;
+$$;
+
+ANALYZE historique_action;
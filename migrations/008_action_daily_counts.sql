@@ -0,0 +1,22 @@
+-- Agrégats journaliers des actions (dashboard "actions du jour", activité par jour)
+-- Maintenus par l'API dans la transaction de chaque insertion dans historique_action.
+-- Appliquer avant de déployer le code qui les alimente; les actions insérées
+-- entre-temps se rattrapent avec: python -m scripts.backfill_activity --depuis AAAA-MM-JJ
+
+CREATE TABLE IF NOT EXISTS action_daily_counts (
+    jour DATE NOT NULL,
+    type_action VARCHAR(100) NOT NULL,
+    bo VARCHAR(100) NOT NULL DEFAULT '',
+    user_id INTEGER NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT now(),
+    PRIMARY KEY (jour, type_action, bo, user_id)
+);
+
+-- Remplissage initial (BO actuelle de l'utilisateur), uniquement si la table est vide
+INSERT INTO action_daily_counts (jour, type_action, bo, user_id, total, updated_at)
+SELECT date(h.date_action), h.type_action, COALESCE(u.base_affectee, ''), h.user_id, count(*), now()
+FROM historique_action h
+JOIN utilisateur u ON u.id_utilisateur = h.user_id
+WHERE NOT EXISTS (SELECT 1 FROM action_daily_counts)
+GROUP BY 1, 2, 3, 4;
@@ -0,0 +1,12 @@
+-- Historique paginé d'un concentrateur (GET /concentrateurs/{numero_serie}):
+-- les N dernières actions se lisent dans l'ordre de l'index, sans tri.
+-- Pas de CONCURRENTLY sur une table partitionnée (migration 007): l'écriture
+-- sur historique_action est bloquée le temps de la construction.
+
+CREATE INDEX IF NOT EXISTS ix_historique_action_concentrateur_date_id
+    ON historique_action (concentrateur_id, date_action DESC, id_action DESC);
+
+-- Couvert par le nouvel index (même première colonne)
+DROP INDEX IF EXISTS ix_historique_action_concentrateur_id;
+
+ANALYZE historique_action;
@@ -0,0 +1,33 @@
+-- Index composites des filtres de GET /concentrateurs et de l'export:
+-- BO (get_user_bo_filter), état, opérateur, puis l'ordre de pagination
+-- ORDER BY date_dernier_etat DESC, numero_serie DESC.
+-- Vérification des plans: python -m scripts.verify_database --explain
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_concentrateur_affectation_dernier_etat
+    ON concentrateur (affectation, date_dernier_etat DESC, numero_serie DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_concentrateur_affectation_etat_dernier_etat
+    ON concentrateur (affectation, etat, date_dernier_etat DESC, numero_serie DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_concentrateur_affectation_operateur_dernier_etat
+    ON concentrateur (affectation, operateur, date_dernier_etat DESC, numero_serie DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_concentrateur_etat_dernier_etat
+    ON concentrateur (etat, date_dernier_etat DESC, numero_serie DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_concentrateur_operateur_dernier_etat
+    ON concentrateur (operateur, date_dernier_etat DESC, numero_serie DESC);
+
+-- Stock magasin: petit index partiel, seules les lignes concernées y figurent.
+-- Utilisable quand le plan connaît les valeurs (plan personnalisé); sinon
+-- ix_concentrateur_affectation_etat_dernier_etat sert la même requête.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_concentrateur_magasin_en_stock
+    ON concentrateur (date_dernier_etat DESC, numero_serie DESC)
+    WHERE etat = 'en_stock' AND affectation = 'Magasin';
+
+-- Préfixes des index composites ci-dessus
+DROP INDEX CONCURRENTLY IF EXISTS ix_concentrateur_affectation;
+DROP INDEX CONCURRENTLY IF EXISTS ix_concentrateur_etat;
+DROP INDEX CONCURRENTLY IF EXISTS ix_concentrateur_operateur;
+
+ANALYZE concentrateur;
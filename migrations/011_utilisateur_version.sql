@@ -0,0 +1,22 @@
+-- Version de la table utilisateur (ETag et cache de /stats/overview: total_utilisateurs)
+-- Les comptes sont créés hors API (SQL, console Supabase): un trigger incrémente
+-- la version à chaque création ou suppression.
+
+INSERT INTO table_versions (table_name, version)
+VALUES ('utilisateur', 0)
+ON CONFLICT (table_name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_utilisateur_version() RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE table_versions
+    SET version = version + 1, updated_at = now()
+    WHERE table_name = 'utilisateur';
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_utilisateur_version ON utilisateur;
+
+CREATE TRIGGER trg_utilisateur_version
+    AFTER INSERT OR DELETE ON utilisateur
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_utilisateur_version();
@@ -0,0 +1,8 @@
+-- Statut de génération des rapports, enregistré sur le Rapport
+-- (la génération tourne en tâche de fond: le suivi doit être lisible
+-- depuis n'importe quel worker et survivre à un redémarrage).
+-- Les rapports existants ont déjà leur fichier: statut 'termine'.
+
+ALTER TABLE rapport ADD COLUMN IF NOT EXISTS statut VARCHAR(20) NOT NULL DEFAULT 'termine';
+ALTER TABLE rapport ADD COLUMN IF NOT EXISTS lignes INTEGER;
+ALTER TABLE rapport ADD COLUMN IF NOT EXISTS erreur TEXT;
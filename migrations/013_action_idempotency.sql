@@ -0,0 +1,22 @@
+-- Clés d'idempotence de POST /actions/batch dans une table non partitionnée
+-- Depuis la migration 007, l'index unique de historique_action inclut
+-- date_action (clé de partition): il ne garantit plus l'unicité de la clé
+-- et sa recherche parcourt toutes les partitions.
+-- Appliquer avant de déployer le code qui l'alimente.
+
+CREATE TABLE IF NOT EXISTS action_idempotency (
+    idempotency_key VARCHAR(100) PRIMARY KEY,
+    id_action INTEGER NOT NULL,
+    date_action TIMESTAMP NOT NULL
+);
+
+-- Clés déjà reçues (la plus ancienne action en cas de doublon)
+INSERT INTO action_idempotency (idempotency_key, id_action, date_action)
+SELECT DISTINCT ON (idempotency_key) idempotency_key, id_action, date_action
+FROM historique_action
+WHERE idempotency_key IS NOT NULL
+ORDER BY idempotency_key, date_action, id_action
+ON CONFLICT (idempotency_key) DO NOTHING;
+
+-- Index partitionné: pas de DROP INDEX CONCURRENTLY possible
+DROP INDEX IF EXISTS ux_historique_action_idempotency_key;
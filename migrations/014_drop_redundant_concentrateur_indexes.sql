@@ -0,0 +1,15 @@
+-- Index redondants de concentrateur (coût à chaque écriture, sans gain en lecture)
+-- - ix_concentrateur_numero_serie: doublon de la clé primaire
+-- - ix_concentrateur_numero_serie_pattern: préfixe de numéro de série servi
+--   par la clé primaire (collation C) ou par ix_concentrateur_numero_serie_trgm
+-- - ix_concentrateur_numero_carton_pattern: la recherche sur le carton est
+--   un ILIKE '%terme%' (ix_concentrateur_numero_carton_trgm)
+-- ix_concentrateur_dernier_etat_serie (migration 001) est conservé: seul
+-- index de l'ordre de pagination pour la liste admin sans filtre.
+-- Vérification des plans: python -m scripts.verify_database --explain
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_concentrateur_numero_serie;
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_concentrateur_numero_serie_pattern;
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_concentrateur_numero_carton_pattern;
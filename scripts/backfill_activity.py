@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Recalcul des agrégats journaliers des actions (action_daily_counts)
+depuis historique_action: remplissage initial, ou rattrapage à partir
+d'une date (actions insérées hors API). À lancer en heure creuse.
+
+Usage: python -m scripts.backfill_activity [--depuis AAAA-MM-JJ]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+from datetime import date
+
+sys.path.insert(0, '.')
+
+from app.core.database import AsyncSessionLocal, dispose_engine
+from app.services.activity import rebuild_activity
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Agrégats journaliers des actions")
+    parser.add_argument("--depuis", type=date.fromisoformat, default=None,
+                        help="Premier jour recalculé (défaut: tout l'historique)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(" AGREGATS JOURNALIERS DES ACTIONS")
+    print("=" * 60)
+    debut = args.depuis.isoformat() if args.depuis else "début de l'historique"
+    print(f" Période: {debut} -> aujourd'hui")
+
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        groups = await rebuild_activity(db, args.depuis)
+        await db.commit()
+    print(f"\n [OK] {groups} groupe(s) écrits ({time.perf_counter() - start:.1f}s)")
+
+    await dispose_engine()
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+"""
+Benchmarks de performance contre une base Postgres locale.
+
+Usage: python -m scripts.benchmark <scenario> [--url URL] [--iterations N]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import resource
+import statistics
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.insert(0, '.')
+
+from datetime import datetime
+
+from sqlalchemy import text, select, func, and_, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import settings
+from app.core.database import build_engine, warmup_pool, MODE_SERVER, MODE_SERVERLESS
+from app.api.pagination import keyset_order, keyset_condition
+from app.api.v1.stats import build_overview_query
+from app.services.actions import list_actions_with_users, action_with_user
+from app.services.reception import receptionner_carton
+from app.services import scan, stats_cache
+from app.services.export import stream_query, format_rows
+from app.services.search import contains_condition, serial_prefix_condition, search_condition
+from app.core import security
+from app.core.security import (
+    create_access_token,
+    decode_access_token,
+    get_password_hash,
+    verify_password,
+    verify_password_async,
+)
+from app.api import deps
+from app.models import Concentrateur, HistoriqueAction, PosteElectrique, Carton, Utilisateur
+
+SCENARIOS: Dict[str, Callable[[argparse.Namespace], Awaitable[None]]] = {}
+
+
+def scenario(name: str):
+    """Enregistre un scénario de benchmark."""
+    def decorator(func):
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+def print_header(title: str) -> None:
+    """Affiche un header formaté."""
+    print(f"\n{'=' * 60}")
+    print(f" {title}")
+    print('=' * 60)
+
+
+def print_latencies(label: str, samples: List[float]) -> None:
+    """Affiche p50/p99/moyenne d'une série de mesures (en ms)."""
+    if not samples:
+        print(f" {label:<40} (aucune mesure)")
+        return
+    ordered = sorted(samples)
+    p50 = ordered[len(ordered) // 2]
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    mean = statistics.mean(ordered)
+    print(f" {label:<40} p50={p50:8.3f}ms  p99={p99:8.3f}ms  moy={mean:8.3f}ms")
+
+
+async def timed(coro_factory: Callable[[], Awaitable], iterations: int) -> List[float]:
+    """Exécute une coroutine N fois et retourne les durées en ms."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await coro_factory()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def ensure_concentrateurs(engine: AsyncEngine, count: int) -> int:
+    """
+    Complète la table concentrateur avec des lignes synthétiques BENCH-*
+    jusqu'à atteindre `count` lignes. Retourne le nombre total.
+    """
+    async with engine.begin() as conn:
+        result = await conn.execute(text("SELECT COUNT(*) FROM concentrateur"))
+        existing = result.scalar()
+        missing = count - existing
+        if missing > 0:
+            print(f" Insertion de {missing} concentrateurs synthétiques...")
+            await conn.execute(text("""
+                INSERT INTO concentrateur (
+                    numero_serie, operateur, etat, affectation, hs,
+                    date_affectation, date_dernier_etat, date_creation, created_at, updated_at
+                )
+                SELECT
+                    'BENCH-' || lpad(g::text, 8, '0'),
+                    (ARRAY['Itron', 'Sagemcom', 'Landis'])[1 + g % 3],
+                    (ARRAY['en_stock', 'pose', 'en_livraison', 'hs', 'retour_constructeur'])[1 + g % 5],
+                    (ARRAY['Magasin', 'BO Nord', 'BO Sud', 'BO Centre', 'Labo'])[1 + g % 5],
+                    g % 5 = 3,
+                    now() - (g || ' minutes')::interval,
+                    now() - (g || ' minutes')::interval,
+                    now(), now(), now()
+                FROM generate_series(:start, :stop) AS g
+            """), {"start": existing + 1, "stop": count})
+            await conn.execute(text("ANALYZE concentrateur"))
+    return max(existing, count)
+
+
+@scenario("pool")
+async def bench_pool(args: argparse.Namespace) -> None:
+    """Latence d'acquisition d'une connexion selon le mode de déploiement."""
+    print_header("ACQUISITION DE CONNEXION PAR MODE")
+
+    for mode in (MODE_SERVER, MODE_SERVERLESS):
+        engine = build_engine(args.url, mode)
+        warmed = await warmup_pool(engine=engine)
+
+        async def acquire():
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        samples = await timed(acquire, args.iterations)
+        print_latencies(f"{mode} (préchauffées: {warmed})", samples)
+
+        # Rafale concurrente: 20 requêtes simultanées
+        start = time.perf_counter()
+        await asyncio.gather(*(acquire() for _ in range(20)))
+        print(f" {'  rafale x20':<40} total={(time.perf_counter() - start) * 1000:8.3f}ms")
+
+        await engine.dispose()
+
+
+@scenario("pagination")
+async def bench_pagination(args: argparse.Namespace) -> None:
+    """Page 1 vs page 5000 de GET /concentrateurs, en mode offset et curseur."""
+    print_header("PAGINATION OFFSET vs CURSEUR")
+    limit = 50
+    deep_page = 5000
+
+    engine = build_engine(args.url, MODE_SERVER)
+    await ensure_concentrateurs(engine, limit * (deep_page + 1))
+
+    order = keyset_order(Concentrateur.date_dernier_etat, Concentrateur.numero_serie)
+    base = select(Concentrateur).order_by(*order)
+
+    # Curseur de la dernière ligne de la page deep_page - 1 (hors mesure)
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            select(Concentrateur.date_dernier_etat, Concentrateur.numero_serie)
+            .order_by(*order).offset((deep_page - 1) * limit - 1).limit(1)
+        )
+        deep_cursor = tuple(result.one())
+
+    queries = {
+        "offset page 1": base.offset(0).limit(limit),
+        f"offset page {deep_page}": base.offset((deep_page - 1) * limit).limit(limit),
+        "curseur page 1": base.limit(limit + 1),
+        f"curseur page {deep_page}": base.where(
+            keyset_condition(Concentrateur.date_dernier_etat, Concentrateur.numero_serie, deep_cursor)
+        ).limit(limit + 1),
+    }
+
+    for label, query in queries.items():
+        async def run():
+            async with engine.connect() as conn:
+                (await conn.execute(query)).all()
+
+        samples = await timed(run, args.iterations)
+        print_latencies(label, samples)
+
+    await engine.dispose()
+
+
+@scenario("stats-overview")
+async def bench_stats_overview(args: argparse.Namespace) -> None:
+    """GET /stats/overview: 8 requêtes séquentielles vs requête agrégée unique."""
+    print_header("STATS OVERVIEW (~200k concentrateurs)")
+
+    engine = build_engine(args.url, MODE_SERVER)
+    await ensure_concentrateurs(engine, 200_000)
+    today = datetime.utcnow().date()
+
+    # Ancienne implémentation: un aller-retour par indicateur
+    legacy_queries = [
+        select(func.count()).select_from(Concentrateur),
+        select(Concentrateur.etat, func.count()).group_by(Concentrateur.etat),
+        select(func.count()).where(and_(
+            Concentrateur.etat == 'en_stock', Concentrateur.affectation == 'Magasin'
+        )),
+        select(func.count()).where(and_(
+            Concentrateur.etat == 'en_stock',
+            Concentrateur.affectation.in_(['BO Nord', 'BO Sud', 'BO Centre'])
+        )),
+        select(func.count()).select_from(HistoriqueAction)
+        .where(func.date(HistoriqueAction.date_action) == today),
+        select(func.count()).select_from(PosteElectrique),
+        select(func.count()).select_from(Carton),
+        select(func.count()).select_from(Utilisateur),
+    ]
+
+    async def legacy():
+        async with engine.connect() as conn:
+            for query in legacy_queries:
+                (await conn.execute(query)).all()
+
+    async def aggregated():
+        async with engine.connect() as conn:
+            (await conn.execute(build_overview_query(today))).one()
+
+    print_latencies("séquentiel (8 requêtes)", await timed(legacy, args.iterations))
+    print_latencies("agrégé (1 requête)", await timed(aggregated, args.iterations))
+
+    await engine.dispose()
+
+
+@scenario("actions-recentes")
+async def bench_actions_recentes(args: argparse.Namespace) -> None:
+    """GET /stats/actions-recentes: nombre de requêtes SQL constant quel que soit limit."""
+    print_header("ACTIONS RECENTES (JOIN utilisateur)")
+
+    engine = build_engine(args.url, MODE_SERVER)
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+    counts = {}
+    for limit in (10, 100):
+        async def run():
+            async with AsyncSession(engine) as db:
+                actions, _ = await list_actions_with_users(db, limit=limit)
+                [action_with_user(action) for action in actions]
+
+        statements.clear()
+        await run()
+        counts[limit] = len(statements)
+        print_latencies(f"limit={limit} ({counts[limit]} requête(s))", await timed(run, args.iterations))
+
+    assert counts[10] == counts[100] == 1, f"Requêtes SQL non constantes: {counts}"
+    print("\n [OK] Une seule requête SQL quel que soit limit")
+
+    await engine.dispose()
+
+
+async def first_user_id(engine: AsyncEngine) -> int:
+    """Identifiant d'un utilisateur existant (clé étrangère des actions)."""
+    async with engine.connect() as conn:
+        result = await conn.execute(select(Utilisateur.id_utilisateur).limit(1))
+        return result.scalar_one()
+
+
+@scenario("reception")
+async def bench_reception(args: argparse.Namespace) -> None:
+    """POST /magasin/reception de 10k unités: objets ORM unitaires vs INSERT multi-lignes."""
+    print_header("RECEPTION 10 000 UNITES: ORM vs BULK")
+    quantite = 10_000
+
+    engine = build_engine(args.url, MODE_SERVER)
+    user_id = await first_user_id(engine)
+
+    async def orm():
+        # Ancienne implémentation: un Concentrateur + une HistoriqueAction par unité
+        async with AsyncSession(engine) as db:
+            db.add(Carton(numero_carton="BENCH-ORM", operateur="Itron"))
+            for i in range(quantite):
+                serial = f"BENCH-ORM-{i:06d}"
+                db.add(Concentrateur(
+                    numero_serie=serial, operateur="Itron", etat="en_stock",
+                    affectation="Magasin", numero_carton="BENCH-ORM",
+                    date_affectation=datetime.utcnow(), date_dernier_etat=datetime.utcnow(),
+                ))
+                db.add(HistoriqueAction(
+                    type_action="reception_magasin", ancien_etat="en_livraison",
+                    nouvel_etat="en_stock", nouvelle_affectation="Magasin",
+                    user_id=user_id, concentrateur_id=serial, carton_id="BENCH-ORM",
+                ))
+            await db.flush()
+            await db.rollback()
+
+    async def bulk():
+        async with AsyncSession(engine) as db:
+            await receptionner_carton(db, "BENCH-BULK", "Itron", quantite, user_id)
+            await db.rollback()
+
+    iterations = min(args.iterations, 5)
+    for label, run in (("ORM unitaire", orm), ("bulk", bulk)):
+        samples = await timed(run, iterations)
+        print_latencies(label, samples)
+        print(f" {'  par unité':<40} {statistics.mean(samples) * 1000 / quantite:8.3f}µs")
+
+    await engine.dispose()
+
+
+@scenario("auth-me")
+async def bench_auth_me(args: argparse.Namespace) -> None:
+    """GET /auth/me avec et sans cache des utilisateurs authentifiés (base de l'app: DATABASE_URL)."""
+    import httpx
+    from app.main import app
+
+    print_header("GET /auth/me: CACHE UTILISATEUR")
+
+    engine = build_engine(args.url, MODE_SERVER)
+    user_id = await first_user_id(engine)
+    await engine.dispose()
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def sans_cache():
+            deps._user_cache.clear()
+            response = await client.get("/api/v1/auth/me", headers=headers)
+            response.raise_for_status()
+
+        async def avec_cache():
+            response = await client.get("/api/v1/auth/me", headers=headers)
+            response.raise_for_status()
+
+        print_latencies("sans cache", await timed(sans_cache, args.iterations))
+        await avec_cache()
+        print_latencies("avec cache", await timed(avec_cache, args.iterations))
+
+
+@scenario("login-storm")
+async def bench_login_storm(args: argparse.Namespace) -> None:
+    """
+    Latence de GET /concentrateurs pendant une rafale de vérifications bcrypt,
+    vérification dans la boucle d'événements vs pool de threads dédié.
+    """
+    import httpx
+    from app.main import app
+
+    print_header("GET /concentrateurs PENDANT UNE RAFALE DE LOGINS")
+    print(f"BCRYPT_ROUNDS={settings.BCRYPT_ROUNDS} PASSWORD_HASH_CONCURRENCY={settings.PASSWORD_HASH_CONCURRENCY}")
+
+    engine = build_engine(args.url, MODE_SERVER)
+    user_id = await first_user_id(engine)
+    await engine.dispose()
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    password_hash = get_password_hash("benchmark")
+    logins = 50
+
+    async def verification_bloquante():
+        verify_password("benchmark", password_hash)
+
+    async def verification_deportee():
+        await verify_password_async("benchmark", password_hash)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def lister():
+            response = await client.get("/api/v1/concentrateurs", params={"limit": 20}, headers=headers)
+            response.raise_for_status()
+
+        await lister()
+        print_latencies("au repos", await timed(lister, args.iterations))
+
+        for label, verification in (
+            ("bcrypt dans la boucle", verification_bloquante),
+            ("bcrypt hors boucle", verification_deportee),
+        ):
+            samples: List[float] = []
+
+            async def login():
+                # Chaque login rend la main au moins une fois, comme une vraie requête
+                await asyncio.sleep(0)
+                await verification()
+
+            async def mesures():
+                samples.extend(await timed(lister, args.iterations))
+
+            start = time.perf_counter()
+            await asyncio.gather(mesures(), *(login() for _ in range(logins)))
+            print_latencies(f"{label} ({logins} logins)", samples)
+            print(f"  durée totale: {time.perf_counter() - start:.2f}s")
+
+
+@scenario("jwt-decode")
+async def bench_jwt_decode(args: argparse.Namespace) -> None:
+    """Débit de decode_access_token (tokens/s) par backend, avec et sans cache."""
+    print_header("DÉCODAGE JWT")
+
+    claims = {"sub": "1", "role": "admin", "bo": None}
+    iterations = args.iterations * 50
+    encode_defaut, decode_defaut = security._jwt_encode, security._jwt_decode
+
+    for name in security.JWT_BACKENDS:
+        try:
+            security._jwt_encode, security._jwt_decode = security.get_jwt_backend(name)
+        except RuntimeError as exc:
+            print(f" {name:<10} indisponible: {exc}")
+            continue
+
+        token = create_access_token(claims)
+        for label, clear in (("sans cache", True), ("avec cache", False)):
+            security._token_cache.clear()
+            start = time.perf_counter()
+            for _ in range(iterations):
+                if clear:
+                    security._token_cache.clear()
+                assert decode_access_token(token) is not None
+            elapsed = time.perf_counter() - start
+            print(f" {name:<10} {label:<12} {iterations / elapsed:>12,.0f} tokens/s")
+
+    security._jwt_encode, security._jwt_decode = encode_defaut, decode_defaut
+
+
+@scenario("verify")
+async def bench_verify(args: argparse.Namespace) -> None:
+    """lookup_scans (cœur de /concentrateurs/verify): cache froid vs chaud, unitaire et carton."""
+    print_header("SCAN QR: /concentrateurs/verify")
+
+    engine = build_engine(args.url, MODE_SERVER)
+    async with AsyncSession(engine) as session:
+        result = await session.execute(select(Concentrateur.numero_serie).limit(100))
+        serials = list(result.scalars())
+        if not serials:
+            print("Aucun concentrateur en base")
+            await engine.dispose()
+            return
+
+        async def froid():
+            scan._scan_cache.clear()
+            await scan.lookup_scans(session, serials[:1])
+
+        async def chaud():
+            await scan.lookup_scans(session, serials[:1])
+
+        async def carton_froid():
+            scan._scan_cache.clear()
+            await scan.lookup_scans(session, serials)
+
+        async def carton_chaud():
+            await scan.lookup_scans(session, serials)
+
+        print_latencies("unitaire, cache froid", await timed(froid, args.iterations))
+        print_latencies("unitaire, cache chaud", await timed(chaud, args.iterations))
+        print_latencies(f"carton de {len(serials)}, cache froid", await timed(carton_froid, args.iterations))
+        print_latencies(f"carton de {len(serials)}, cache chaud", await timed(carton_chaud, args.iterations))
+
+    await engine.dispose()
+
+
+@scenario("search")
+async def bench_search(args: argparse.Namespace) -> None:
+    """Recherche GET /concentrateurs à 500k lignes: ILIKE '%terme%' vs préfixe vs search_condition."""
+    print_header("RECHERCHE CONCENTRATEURS (500k lignes)")
+    limit = 50
+
+    engine = build_engine(args.url, MODE_SERVER)
+    await ensure_concentrateurs(engine, 500_000)
+
+    order = keyset_order(Concentrateur.date_dernier_etat, Concentrateur.numero_serie)
+    async with AsyncSession(engine) as session:
+        queries = {
+            "contient '0012345'": contains_condition("0012345"),
+            "contient 'sagem'": contains_condition("sagem"),
+            "préfixe 'BENCH-0001234'": serial_prefix_condition("BENCH-0001234"),
+            "search_condition('CPL-ITR-')": await search_condition(session, "CPL-ITR-"),
+        }
+
+    for label, condition in queries.items():
+        query = select(Concentrateur).where(condition).order_by(*order).limit(limit + 1)
+
+        async def run():
+            async with engine.connect() as conn:
+                (await conn.execute(query)).all()
+
+        print_latencies(label, await timed(run, args.iterations))
+
+        async with engine.connect() as conn:
+            compiled = query.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+            result = await conn.exec_driver_sql(f"EXPLAIN {compiled}")
+            plan = [row[0] for row in result]
+        print("   " + "\n   ".join(line for line in plan if "Scan" in line))
+
+    await engine.dispose()
+
+
+@scenario("etag")
+async def bench_etag(args: argparse.Namespace) -> None:
+    """Polling de GET /stats/overview: réponse complète vs 304 (If-None-Match)."""
+    import httpx
+    from app.main import app
+
+    print_header("GET /stats/overview: ETAG / 304")
+
+    engine = build_engine(args.url, MODE_SERVER)
+    user_id = await first_user_id(engine)
+    await engine.dispose()
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.get("/api/v1/stats/overview", headers=headers)
+        response.raise_for_status()
+        etag = response.headers["ETag"]
+
+        async def complet():
+            response = await client.get("/api/v1/stats/overview", headers=headers)
+            assert response.status_code == 200
+
+        async def revalidation():
+            response = await client.get(
+                "/api/v1/stats/overview", headers={**headers, "If-None-Match": etag}
+            )
+            assert response.status_code == 304
+
+        print_latencies("200 (calcul complet)", await timed(complet, args.iterations))
+        print_latencies("304 (If-None-Match)", await timed(revalidation, args.iterations))
+
+
+@scenario("stats-cache")
+async def bench_stats_cache(args: argparse.Namespace) -> None:
+    """50 chargements simultanés de GET /stats/overview: requêtes d'agrégat exécutées."""
+    import httpx
+    from app.core.database import get_engine
+    from app.main import app
+
+    print_header("CACHE DES STATISTIQUES (50 dashboards simultanés)")
+
+    engine = build_engine(args.url, MODE_SERVER)
+    user_id = await first_user_id(engine)
+    await engine.dispose()
+
+    statements = []
+    event.listen(get_engine().sync_engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def rafale():
+            responses = await asyncio.gather(*(
+                client.get("/api/v1/stats/overview", headers=headers) for _ in range(50)
+            ))
+            for response in responses:
+                response.raise_for_status()
+
+        for label in ("cache froid", "cache chaud"):
+            if label == "cache froid":
+                await stats_cache.get_stats_cache().clear()
+            statements.clear()
+            start = time.perf_counter()
+            await rafale()
+            elapsed = (time.perf_counter() - start) * 1000
+            agregats = sum(1 for statement in statements if "concentrateur_counters" in statement)
+            print(f" {label:<12} {elapsed:>8.1f}ms  requêtes d'agrégat: {agregats}")
+
+
+def peak_rss_mb() -> float:
+    """Pic de mémoire résidente du processus (Mo, Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@scenario("export")
+async def bench_export(args: argparse.Namespace) -> None:
+    """Export CSV des concentrateurs (300k lignes sous Postgres): lignes/s et pic RSS."""
+    from app.api.v1.concentrateurs import EXPORT_COLUMNS
+
+    print_header("EXPORT CSV CONCENTRATEURS")
+
+    engine = build_engine(args.url, MODE_SERVER)
+    if engine.dialect.name == "postgresql":
+        await ensure_concentrateurs(engine, 300_000)
+    query = select(*EXPORT_COLUMNS).order_by(Concentrateur.numero_serie)
+    columns = [column.key for column in query.selected_columns]
+
+    # Streaming en premier: le pic RSS ne fait que croître
+    async with AsyncSession(engine) as session:
+        base_rss = peak_rss_mb()
+        rows = size = 0
+        start = time.perf_counter()
+        async for chunk in stream_query(query, "csv", db=session):
+            rows += chunk.count("\n")
+            size += len(chunk)
+        elapsed = time.perf_counter() - start
+        rows -= 1  # en-tête
+        print(f" curseur serveur   {rows:>9} lignes  {rows / elapsed:>10,.0f} lignes/s  "
+              f"{size / 1e6:>7.1f} Mo  pic RSS +{peak_rss_mb() - base_rss:.1f} Mo")
+
+    async with AsyncSession(engine) as session:
+        base_rss = peak_rss_mb()
+        start = time.perf_counter()
+        result = await session.execute(query)
+        body = format_rows(result.all(), columns, "csv", header=True)
+        elapsed = time.perf_counter() - start
+        print(f" tout en mémoire   {rows:>9} lignes  {rows / elapsed:>10,.0f} lignes/s  "
+              f"{len(body) / 1e6:>7.1f} Mo  pic RSS +{peak_rss_mb() - base_rss:.1f} Mo")
+
+    await engine.dispose()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks API concentrateurs")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("--url", default=settings.DATABASE_URL)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    await SCENARIOS[args.scenario](args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Génération hors API de l'historique des actions d'une période
+(déploiement serverless, tâches planifiées).
+Écrit le fichier dans RAPPORTS_DIR et enregistre le Rapport.
+
+Usage: python -m scripts.generate_report --debut 2025-01-01 --fin 2025-02-01 --user-id 1 [--format csv|parquet]
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+from datetime import datetime
+
+sys.path.insert(0, '.')
+
+from app.core.database import AsyncSessionLocal, dispose_engine
+from app.services.reports import REPORT_FORMATS, create_rapport, generate_actions_report
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rapport historique des actions")
+    parser.add_argument("--debut", required=True, type=datetime.fromisoformat, help="Début inclus (ISO)")
+    parser.add_argument("--fin", required=True, type=datetime.fromisoformat, help="Fin exclue (ISO)")
+    parser.add_argument("--user-id", required=True, type=int, help="Utilisateur auteur du rapport")
+    parser.add_argument("--format", default="csv", choices=REPORT_FORMATS)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(" RAPPORT HISTORIQUE DES ACTIONS")
+    print("=" * 60)
+    print(f" Période: {args.debut} -> {args.fin} ({args.format})")
+
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        rapport = await create_rapport(db, args.user_id, args.debut, args.fin, args.format)
+    rapport = await generate_actions_report(rapport.id_rapport)
+    print(f"\n [OK] Rapport {rapport.id_rapport}: {rapport.fichier} ({time.perf_counter() - start:.1f}s)")
+
+    await dispose_engine()
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
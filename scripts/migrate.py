@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Script d'application des migrations SQL du dossier migrations/.
+Chaque fichier NNN_nom.sql est appliqué une seule fois, dans l'ordre,
+et enregistré dans la table schema_migrations.
+
+Usage: python -m scripts.migrate [--dry-run]
+"""
+
+import sys
+import asyncio
+import argparse
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, '.')
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import text
+
+from app.core.config import settings
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Découpe un fichier SQL en statements (séparateur ';'),
+    en respectant les blocs $$ ... $$ des fonctions et DO.
+    """
+    statements = []
+    current = []
+    in_dollar = False
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if not in_dollar and (not stripped or stripped.startswith("--")):
+            continue
+        current.append(line)
+        if line.count("$$") % 2 == 1:
+            in_dollar = not in_dollar
+        if not in_dollar and stripped.endswith(";"):
+            statements.append("\n".join(current).rstrip().rstrip(";"))
+            current = []
+    if current and "\n".join(current).strip():
+        statements.append("\n".join(current).rstrip().rstrip(";"))
+    return statements
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Application des migrations SQL")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche les migrations sans les appliquer")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(" MIGRATIONS")
+    print("=" * 60)
+
+    # AUTOCOMMIT: nécessaire pour CREATE INDEX CONCURRENTLY
+    engine = create_async_engine(settings.DATABASE_URL, echo=False, isolation_level="AUTOCOMMIT")
+
+    async with engine.connect() as conn:
+        await conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(100) PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+        """))
+        result = await conn.execute(text("SELECT version FROM schema_migrations"))
+        applied = {row[0] for row in result}
+
+    files = sorted(MIGRATIONS_DIR.glob("*.sql"))
+    pending = [f for f in files if f.stem not in applied]
+
+    print(f"\n {len(files)} migration(s), {len(pending)} à appliquer")
+
+    for path in pending:
+        statements = split_statements(path.read_text(encoding="utf-8"))
+        print(f"\n [{path.stem}] {len(statements)} statement(s)")
+        if args.dry_run:
+            continue
+        async with engine.connect() as conn:
+            for stmt in statements:
+                await conn.exec_driver_sql(stmt)
+            await conn.execute(
+                text("INSERT INTO schema_migrations (version) VALUES (:version)"),
+                {"version": path.stem}
+            )
+        print(" [OK] Appliquée")
+
+    await engine.dispose()
+
+    print("\n" + "=" * 60)
+    print(" MIGRATIONS TERMINEES")
+    print("=" * 60)
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Maintenance des partitions mensuelles de historique_action (Postgres):
+création des partitions à venir et rétention des plus anciennes
+(détachées vers le schéma archive, ou supprimées avec --drop).
+À planifier une fois par mois (cron), indispensable en serverless.
+
+Usage: python -m scripts.partitions [--ahead 3] [--retention-months 24] [--drop] [--dry-run]
+"""
+
+import sys
+import asyncio
+import argparse
+
+sys.path.insert(0, '.')
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, dispose_engine
+from app.services.partitions import (
+    ARCHIVE_SCHEMA, detach_old_partitions, ensure_partitions, is_partitioned, list_partitions
+)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Partitions de historique_action")
+    parser.add_argument("--ahead", type=int, default=settings.HISTORIQUE_PARTITIONS_AHEAD,
+                        help="Mois créés à l'avance")
+    parser.add_argument("--retention-months", type=int, default=settings.HISTORIQUE_RETENTION_MONTHS,
+                        help="Mois conservés, mois courant inclus (0 = tout conserver)")
+    parser.add_argument("--drop", action="store_true", help="Supprime au lieu d'archiver")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche sans modifier")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(" PARTITIONS HISTORIQUE_ACTION")
+    print("=" * 60)
+
+    async with AsyncSessionLocal() as db:
+        if not is_partitioned(db):
+            print("\n [SKIP] Partitionnement disponible uniquement sous PostgreSQL")
+            await dispose_engine()
+            return
+
+        if not args.dry_run:
+            noms = await ensure_partitions(db, args.ahead)
+            print(f"\n [OK] Partitions garanties: {', '.join(noms)}")
+
+        anciennes = await detach_old_partitions(
+            db, args.retention_months, drop=args.drop, dry_run=args.dry_run
+        )
+        destination = "supprimée(s)" if args.drop else f"déplacée(s) dans {ARCHIVE_SCHEMA}"
+        if not anciennes:
+            print(" [OK] Aucune partition hors rétention")
+        elif args.dry_run:
+            print(f" [DRY-RUN] {len(anciennes)} partition(s) à détacher: {', '.join(anciennes)}")
+        else:
+            print(f" [OK] {len(anciennes)} partition(s) détachée(s) et {destination}: {', '.join(anciennes)}")
+
+        if not args.dry_run:
+            await db.commit()
+
+        partitions = await list_partitions(db)
+        if partitions:
+            print(f"\n Partitions attachées: {len(partitions)} "
+                  f"({partitions[0][1]:%Y-%m} -> {partitions[-1][1]:%Y-%m})")
+
+    await dispose_engine()
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
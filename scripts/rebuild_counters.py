@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Script de réconciliation des compteurs matérialisés (concentrateur_counters).
+Affiche les groupes divergents puis recalcule tous les compteurs.
+
+Usage: python -m scripts.rebuild_counters [--check]
+"""
+
+import sys
+import asyncio
+import argparse
+
+sys.path.insert(0, '.')
+
+from app.core.database import AsyncSessionLocal, dispose_engine
+from app.services.counters import counters_drift, rebuild_counters
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Réconciliation des compteurs concentrateur")
+    parser.add_argument("--check", action="store_true", help="Affiche la dérive sans corriger")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(" RECONCILIATION DES COMPTEURS")
+    print("=" * 60)
+
+    async with AsyncSessionLocal() as db:
+        drift = await counters_drift(db)
+
+        if not drift:
+            print("\n [OK] Aucune dérive détectée")
+        else:
+            print(f"\n [WARN] {len(drift)} groupe(s) divergent(s):")
+            for (affectation, operateur, etat, hs), (stored, actual) in sorted(drift.items()):
+                print(f"  - {affectation or '(aucune)'} / {operateur} / {etat} / hs={hs}: "
+                      f"stocké={stored}, réel={actual}")
+
+        if drift and not args.check:
+            groups = await rebuild_counters(db)
+            await db.commit()
+            print(f"\n [OK] Compteurs reconstruits ({groups} groupes)")
+
+    await dispose_engine()
+    print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
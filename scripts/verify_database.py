@@ -2,21 +2,39 @@
 """
 Script de vérification de la connexion à Supabase
 et des données présentes dans la base de données.
+Avec --explain: plan d'exécution (EXPLAIN ANALYZE) de la requête de chaque
+endpoint principal, et signalement des parcours séquentiels.
 
-Usage: python -m scripts.verify_database
+Usage: python -m scripts.verify_database [--explain] [--min-rows 1000]
 """
 
+import re
 import sys
+import json
 import asyncio
-from typing import List, Tuple, Any
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncConnection
-from sqlalchemy import text, inspect
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Any
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncConnection, AsyncSession
+from sqlalchemy import select, func, text, inspect
 from sqlalchemy.exc import SQLAlchemyError
 
 # Ajouter le chemin parent pour les imports
 sys.path.insert(0, '.')
 
 from app.core.config import settings
+from app.api.pagination import PAGINATION_CURSOR, PAGINATION_OFFSET, encode_cursor, keyset_order, page_query
+from app.api.v1.concentrateurs import concentrateur_detail_query, list_conditions
+from app.api.v1.stats import BO_OPERATIONNELLES, build_overview_query
+from app.models.action import HistoriqueAction
+from app.models.concentrateur import Concentrateur
+from app.services.activity import activity_by_day_query
+from app.services.reports import actions_report_query
+from app.services.scan import scan_query
+
+# Paramètres par défaut des endpoints (limit des listes, historique du détail)
+PAGE_LIMIT = 50
+HISTORIQUE_LIMIT = 20
 
 
 def print_header(title: str) -> None:
@@ -179,8 +197,201 @@ async def get_sample_concentrateurs(engine, limit: int = 3) -> List[Tuple[str, s
         return []
 
 
+async def get_explain_samples(conn: AsyncConnection) -> Dict[str, Any]:
+    """Valeurs présentes en base pour paramétrer les requêtes analysées."""
+    result = await conn.execute(
+        select(Concentrateur.affectation)
+        .where(Concentrateur.affectation.in_(BO_OPERATIONNELLES))
+        .group_by(Concentrateur.affectation)
+        .order_by(func.count().desc())
+        .limit(1)
+    )
+    bo = result.scalar() or "BO Nord"
+    
+    # Position de curseur: dernière ligne de la première page de la BO
+    result = await conn.execute(
+        select(Concentrateur.date_dernier_etat, Concentrateur.numero_serie)
+        .where(Concentrateur.affectation == bo)
+        .order_by(*keyset_order(Concentrateur.date_dernier_etat, Concentrateur.numero_serie))
+        .offset(PAGE_LIMIT - 1)
+        .limit(1)
+    )
+    cursor = result.first() or (None, "")
+    
+    # Idem pour la liste admin sans filtre
+    result = await conn.execute(
+        select(Concentrateur.date_dernier_etat, Concentrateur.numero_serie)
+        .order_by(*keyset_order(Concentrateur.date_dernier_etat, Concentrateur.numero_serie))
+        .offset(PAGE_LIMIT - 1)
+        .limit(1)
+    )
+    admin_cursor = result.first() or (None, "")
+    
+    result = await conn.execute(
+        select(HistoriqueAction.concentrateur_id, HistoriqueAction.user_id)
+        .where(HistoriqueAction.concentrateur_id.isnot(None))
+        .limit(1)
+    )
+    action = result.first() or ("", 0)
+    
+    return {
+        "bo": bo,
+        "cursor": tuple(cursor),
+        "admin_cursor": tuple(admin_cursor),
+        "numero_serie": action[0],
+        "user_id": action[1],
+    }
+
+
+async def get_query_shapes(db: AsyncSession, samples: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    """
+    Requête de chaque endpoint principal, produite par les mêmes fonctions
+    que l'API (filtres, pagination, jointures).
+    """
+    bo = samples["bo"]
+    today = datetime.utcnow().date()
+    
+    async def concentrateurs(bo_filter=None, search=None, etat=None, affectation=None,
+                             operateur=None, after=None):
+        conditions = await list_conditions(db, bo_filter, search, etat, affectation, operateur)
+        return page_query(
+            select(Concentrateur).where(*conditions),
+            Concentrateur.date_dernier_etat, Concentrateur.numero_serie,
+            1, PAGE_LIMIT, PAGINATION_CURSOR if after else PAGINATION_OFFSET, after
+        )
+    
+    def actions(*conditions):
+        return page_query(
+            select(HistoriqueAction).where(*conditions),
+            HistoriqueAction.date_action, HistoriqueAction.id_action,
+            1, PAGE_LIMIT, PAGINATION_OFFSET, None
+        )
+    
+    return [
+        ("GET /concentrateurs (BO)", await concentrateurs(bo)),
+        ("GET /concentrateurs (BO, état)", await concentrateurs(bo, etat="en_stock")),
+        ("GET /concentrateurs (BO, opérateur)", await concentrateurs(bo, operateur="Itron")),
+        ("GET /concentrateurs (BO, curseur)", await concentrateurs(
+            bo, after=encode_cursor(*samples["cursor"])
+        )),
+        ("GET /concentrateurs (admin, sans filtre, curseur)", await concentrateurs(
+            after=encode_cursor(*samples["admin_cursor"])
+        )),
+        ("GET /concentrateurs (admin, état)", await concentrateurs(etat="pose")),
+        ("GET /concentrateurs (admin, opérateur)", await concentrateurs(operateur="Itron")),
+        ("GET /concentrateurs (stock magasin)", await concentrateurs(etat="en_stock", affectation="Magasin")),
+        ("GET /concentrateurs (search préfixe)", await concentrateurs(search="CPL-")),
+        ("GET /concentrateurs/verify", scan_query([samples["numero_serie"]])),
+        ("GET /concentrateurs/{numero_serie}", concentrateur_detail_query(
+            samples["numero_serie"], HISTORIQUE_LIMIT
+        )),
+        ("GET /actions", actions()),
+        ("GET /actions/me", actions(HistoriqueAction.user_id == samples["user_id"])),
+        ("GET /stats/overview", build_overview_query(today)),
+        ("GET /stats/activite-par-jour", activity_by_day_query(today - timedelta(days=29), today + timedelta(days=1))),
+        ("POST /rapports/historique-actions (1 jour)", actions_report_query(
+            datetime.combine(today, datetime.min.time()) - timedelta(days=1),
+            datetime.combine(today, datetime.min.time())
+        )),
+    ]
+
+
+def _postgres_seq_scans(plan: dict):
+    """Noeuds Seq Scan d'un plan EXPLAIN (FORMAT JSON)."""
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan
+    for child in plan.get("Plans", []):
+        yield from _postgres_seq_scans(child)
+
+
+async def explain_query(conn: AsyncConnection, query) -> Tuple[List[Tuple[str, str]], Optional[float]]:
+    """
+    Exécute la requête sous EXPLAIN ANALYZE (PostgreSQL) ou EXPLAIN QUERY PLAN
+    (SQLite, sans exécution).
+    Retourne ([(table, détail)] des parcours séquentiels, temps d'exécution en ms).
+    """
+    compiled = query.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    positions = compiled.positiontup or []
+    params = tuple(compiled.params[name] for name in positions)
+    
+    if conn.dialect.name == "postgresql":
+        result = await conn.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {compiled.string}", params)
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scans = [
+            (
+                node["Relation Name"],
+                f"{node.get('Actual Rows', 0)} ligne(s) lue(s), "
+                f"{node.get('Rows Removed by Filter', 0)} écartée(s) par le filtre"
+            )
+            for node in _postgres_seq_scans(plan[0]["Plan"])
+        ]
+        return scans, plan[0].get("Execution Time")
+    
+    result = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled.string}", params)
+    scans = []
+    for row in result:
+        match = re.fullmatch(r"SCAN (?:TABLE )?(\w+)", row[-1])
+        if match:
+            scans.append((match.group(1), row[-1]))
+    return scans, None
+
+
+async def run_index_advisor(engine, min_rows: int) -> int:
+    """
+    Analyse le plan de chaque requête d'endpoint et signale les parcours
+    séquentiels de tables d'au moins `min_rows` lignes.
+    Retourne le nombre de requêtes signalées.
+    """
+    async with engine.connect() as conn:
+        samples = await get_explain_samples(conn)
+        print(f" BO analysée: {samples['bo']}")
+        
+        table_rows = {}
+        rows = []
+        alertes = []
+        shapes = await get_query_shapes(AsyncSession(bind=conn), samples)
+        for name, query in shapes:
+            try:
+                scans, duration = await explain_query(conn, query)
+            except SQLAlchemyError as e:
+                rows.append((name, "-", "ERREUR"))
+                alertes.append((name, "-", str(e).splitlines()[0]))
+                await conn.rollback()
+                continue
+            
+            signales = []
+            for table, detail in scans:
+                if table not in table_rows:
+                    table_rows[table] = await count_table_rows(engine, table)
+                if table_rows[table] >= min_rows:
+                    signales.append((table, detail))
+            
+            temps = f"{duration:.2f}" if duration is not None else "n/a"
+            rows.append((name, temps, "SEQ SCAN" if signales else "OK"))
+            alertes.extend((name, table, detail) for table, detail in signales)
+    
+    print_table(["Requête", "Temps (ms)", "Plan"], rows)
+    
+    if alertes:
+        print(f"\n [WARN] Parcours séquentiels (tables >= {min_rows} lignes):")
+        for name, table, detail in alertes:
+            print(f"  - {name}: {table} ({detail})")
+    else:
+        print(f"\n [OK] Aucun parcours séquentiel sur une table >= {min_rows} lignes")
+    return len({alerte[0] for alerte in alertes})
+
+
 async def main() -> None:
     """Fonction principale de vérification."""
+    parser = argparse.ArgumentParser(description="Vérification de la base de données")
+    parser.add_argument("--explain", action="store_true",
+                        help="Analyse les plans des requêtes des endpoints")
+    parser.add_argument("--min-rows", type=int, default=1000,
+                        help="Taille minimale d'une table pour signaler un parcours séquentiel")
+    args = parser.parse_args()
+    
     print_header("VERIFICATION BASE DE DONNEES SUPABASE")
     
     # Création de l'engine async
@@ -256,6 +467,11 @@ async def main() -> None:
     for numero, operateur, etat in concentrateurs:
         print(f" - {numero} ({operateur}, {etat})")
     
+    # Plans des requêtes des endpoints
+    if args.explain:
+        print("\n--- Plans d'exécution des endpoints ---")
+        await run_index_advisor(engine, args.min_rows)
+    
     # Fermer l'engine
     await engine.dispose()
     
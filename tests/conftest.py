@@ -0,0 +1,50 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Base SQLite jetable, avant tout import de app (settings lus à l'import)
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/test.db"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.database import AsyncSessionLocal, Base, get_engine
+from app.core.security import create_access_token
+from app.main import app
+from app.models import Concentrateur, HistoriqueAction, Utilisateur
+
+
+async def _seed() -> None:
+    async with get_engine().begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        db.add_all([
+            Utilisateur(id_utilisateur=1, nom="Admin", prenom="A", email="admin@test.fr", role="admin"),
+            Utilisateur(id_utilisateur=2, nom="Agent", prenom="B", email="agent@test.fr",
+                        role="agent_terrain", base_affectee="BO Nord"),
+        ])
+        base = datetime(2025, 1, 1)
+        for i in range(20):
+            db.add(Concentrateur(numero_serie=f"CPL-TST-{i:04d}", operateur="Itron", etat="en_stock",
+                                 affectation="BO Nord", date_dernier_etat=base, hs=False))
+        await db.flush()
+        # Actions de plusieurs utilisateurs: un chargement paresseux ferait une requête par action
+        for i in range(60):
+            db.add(HistoriqueAction(type_action="pose", user_id=1 + i % 2,
+                                    concentrateur_id=f"CPL-TST-{i % 20:04d}",
+                                    date_action=base + timedelta(minutes=i)))
+        await db.commit()
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        test_client.portal.call(_seed)
+        yield test_client
+
+
+@pytest.fixture
+def admin_headers():
+    return {"Authorization": "Bearer " + create_access_token({"sub": "1", "role": "admin"})}
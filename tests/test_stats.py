@@ -0,0 +1,57 @@
+from sqlalchemy import event
+
+from app.core.database import get_engine
+
+
+def _count_statements(client, url, headers):
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = get_engine().sync_engine
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert response.status_code == 200
+    return response, statements
+
+
+def test_actions_recentes_statements_constant(client, admin_headers):
+    """Une seule requête sur historique_action (JOIN utilisateur), quel que soit limit."""
+    # Utilisateur authentifié mis en cache
+    client.get("/api/v1/stats/actions-recentes?limit=1", headers=admin_headers)
+
+    counts = {}
+    for limit in (5, 50):
+        response, statements = _count_statements(
+            client, f"/api/v1/stats/actions-recentes?limit={limit}", headers=admin_headers
+        )
+        assert len(response.json()) == limit
+        actions = [s for s in statements if "historique_action" in s and "table_versions" not in s]
+        assert len(actions) == 1, actions
+        counts[limit] = len(statements)
+
+    assert counts[5] == counts[50], counts
+
+
+def test_actions_recentes_cursor(client, admin_headers):
+    """Le curseur X-Next-Cursor enchaîne les pages sans doublon et est exposé au frontend."""
+    response = client.get(
+        "/api/v1/stats/actions-recentes?limit=25",
+        headers={**admin_headers, "Origin": "http://localhost:5173"}
+    )
+    assert "x-next-cursor" in response.headers["access-control-expose-headers"].lower()
+
+    seen = [action["id_action"] for action in response.json()]
+    cursor = response.headers.get("X-Next-Cursor")
+    while cursor:
+        response = client.get(
+            f"/api/v1/stats/actions-recentes?limit=25&before={cursor}", headers=admin_headers
+        )
+        seen += [action["id_action"] for action in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+
+    assert len(seen) == len(set(seen)) == 60